@@ -0,0 +1,127 @@
+import sys
+import os
+
+# Add the project root directory to Python's path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import json
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.arcgis import FeatureLayer
+from utils.http import HttpClient
+
+# Fetch the recorded la_outages FeatureServer response from a local stub server.
+#
+# The stub serves benchmarks/fixtures/la_outages_query.json (1,200 outages)
+# through the parts of the ArcGIS query API the bot uses: layer info,
+# returnCountOnly, returnIdsOnly, objectIds and resultOffset/resultRecordCount.
+# Like the real layer, it truncates every response at maxRecordCount and sets
+# exceededTransferLimit. "single" is the old one-request fetch, which silently
+# loses everything past the limit; the others must return every outage.
+# Usage: python benchmarks/arcgis_fetch.py [--latency SECONDS] [--max-records N] [--workers N ...]
+
+FIXTURE = os.path.join(project_root, "benchmarks", "fixtures", "la_outages_query.json")
+LAYER_PATH = "/ArcGIS/rest/services/PowerOutageActive/FeatureServer/0"
+
+def start_stub_server(payload, latency, max_records, pagination=True):
+    features = sorted(payload["features"], key=lambda feature: feature["attributes"]["OBJECTID"])
+    layer_info = {
+        "name": "PowerOutageActive",
+        "objectIdField": "OBJECTID",
+        "maxRecordCount": max_records,
+        "advancedQueryCapabilities": {"supportsPagination": pagination},
+        "fields": payload["fields"],
+    }
+
+    class FeatureServerHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, body):
+            body = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if url.path == LAYER_PATH:
+                return self._send(layer_info)
+
+            selected = features
+            if "objectIds" in query:
+                wanted = {int(object_id) for object_id in query["objectIds"].split(",")}
+                selected = [feature for feature in features if feature["attributes"]["OBJECTID"] in wanted]
+            if query.get("returnCountOnly") == "true":
+                return self._send({"count": len(selected)})
+            if query.get("returnIdsOnly") == "true":
+                ids = [feature["attributes"]["OBJECTID"] for feature in selected]
+                return self._send({"objectIdFieldName": "OBJECTID", "objectIds": ids})
+
+            offset = int(query.get("resultOffset", 0))
+            if offset and not pagination:
+                return self._send({"error": {"code": 400, "message": "Pagination is not supported."}})
+            limit = min(int(query.get("resultRecordCount", max_records)), max_records)
+            page = selected[offset:offset + limit]
+            body = {key: value for key, value in payload.items() if key != "features"}
+            body["features"] = page
+            if offset + limit < len(selected):
+                body["exceededTransferLimit"] = True
+            self._send(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeatureServerHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(latency=0.05, max_records=200, worker_counts=(1, 4, 8)):
+    with open(FIXTURE, "r") as f:
+        payload = json.load(f)
+    total = len(payload["features"])
+    params = {"where": "1=1", "outFields": "*", "outSR": 4326, "f": "json", "returnGeometry": "true"}
+
+    print(f"{total} outages, maxRecordCount {max_records}, {latency * 1000:.0f} ms simulated latency")
+    print(f"{'fetch':<28}{'workers':>8}{'seconds':>10}{'outages':>9}")
+    for pagination in (True, False):
+        server = start_stub_server(payload, latency, max_records, pagination)
+        query_url = f"http://127.0.0.1:{server.server_address[1]}{LAYER_PATH}/query"
+        label = "pages" if pagination else "ids (no pagination)"
+
+        if pagination:
+            start = time.perf_counter()
+            single = HttpClient().get(query_url, params=params).json()["features"]
+            print(f"{'single':<28}{1:>8}{time.perf_counter() - start:>10.2f}{len(single):>9}")
+
+        for workers in worker_counts:
+            layer = FeatureLayer(query_url, HttpClient(), max_workers=workers)
+            start = time.perf_counter()
+            features = layer.query(params)
+            elapsed = time.perf_counter() - start
+            ids = sorted(feature["attributes"]["OBJECTID"] for feature in features)
+            assert ids == sorted(feature["attributes"]["OBJECTID"] for feature in payload["features"]), label
+            print(f"{label:<28}{workers:>8}{elapsed:>10.2f}{len(features):>9}")
+        server.shutdown()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    if "--latency" in args:
+        options["latency"] = float(args[args.index("--latency") + 1])
+    if "--max-records" in args:
+        options["max_records"] = int(args[args.index("--max-records") + 1])
+    if "--workers" in args:
+        index = args.index("--workers") + 1
+        counts = []
+        while index < len(args) and not args[index].startswith("--"):
+            counts.append(int(args[index]))
+            index += 1
+        options["worker_counts"] = counts
+    run(**options)
@@ -0,0 +1,362 @@
+import sys
+import os
+
+# Add the project root directory to Python's path; --root points a worker at another revision's tree
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+root = os.path.abspath(sys.argv[sys.argv.index("--root") + 1]) if "--root" in sys.argv else project_root
+sys.path.insert(0, root)
+
+import json
+import time
+import shutil
+import resource
+import tempfile
+import subprocess
+import importlib.util
+from datetime import datetime
+
+# Offline benchmark of every bot's parse-and-write path.
+#
+# Each bot runs end to end with its HTTP requests answered from the recorded
+# responses in benchmarks/fixtures/ (the Crumbl page, the ArcGIS query, a TikTok
+# profile page and a CNN series), so nothing touches the network and uploads are
+# skipped. Its history is the bot's src/data timeseries repeated 1x, 10x, 100x
+# and 1000x, with the key column varied per copy so every row stays distinct
+# (tsla_stock has no timeseries, so it scales by the number of symbols instead).
+# The history is written with the tree's own append_timeseries when it has one,
+# followed by an untimed warm-up run. The timed run then happens in a fresh
+# interpreter (with pandas already imported), which reports wall time, peak RSS
+# and, where the tree records run metrics, the time of each stage (parse,
+# transform, timeseries, write, ...).
+#
+# --compare A [B] runs the suite on git revisions A and B (default: this working
+# tree) from temporary worktrees, using this checkout's fixtures and histories
+# for both. It flags every bot and scale where B is slower or uses more memory
+# than A by more than --threshold, and exits non-zero if there is a regression.
+# Usage: python benchmarks/bot_suite.py [--bots crumbl_menu ...] [--scales 1 10 100 1000] [--repeat 3]
+#        python benchmarks/bot_suite.py --compare HEAD~5 [HEAD] [--threshold 0.1] [--save results.json]
+
+FIXTURES = os.path.join(project_root, "benchmarks", "fixtures")
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_THRESHOLD = 0.10
+# Differences smaller than these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_RSS_MB = 5
+CHUNK_ROWS = 500000
+SHOWN_STAGES = ["load", "fetch", "parse", "transform", "timeseries", "events", "write", "rollups"]
+
+# Recorded responses: (host, path prefix, fixture, content type)
+REPLAY = [
+    ("crumblcookies.com", "/", "crumbl_menu.html", "text/html; charset=utf-8"),
+    ("www.tiktok.com", "/@", "tiktok_profile.html", "text/html; charset=utf-8"),
+    ("services7.arcgis.com", "/", "la_outages_query.json", "application/json"),
+    ("production.dataviz.cnn.io", "/charting/instruments/", "tsla_stock_series.json", "application/json"),
+]
+
+# Each bot's history (relative to its src/data), the column varied per copy and the fixed run time
+BOTS = {
+    "crumbl_menu": {"history": "crumbl_menu_timeseries.json", "key": "cookie", "now": "2025-10-26 06:00"},
+    "la_outages": {"history": "la_outages_timeseries.json", "key": "id", "now": "2025-10-26 06:00"},
+    "tiktok_followers": {"history": "tiktok_followers_timeseries.json", "key": "username", "now": "2025-10-26 06:00"},
+    # The CNN fixture ends on 2024-10-25, a week after the stored series
+    "tsla_stock": {"history": "tsla_stock/tsla_stock.json", "key": None, "now": "2024-10-25 16:00"},
+}
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# --- Worker side: runs inside the tree under test ---
+
+def install_replay():
+    # Every requests adapter answers from the fixtures instead of the network
+    from urllib.parse import urlsplit
+    import requests
+    from requests.adapters import HTTPAdapter
+    bodies = {}
+
+    def send(adapter, request, **kwargs):
+        url = urlsplit(request.url)
+        for host, prefix, fixture, content_type in REPLAY:
+            if url.hostname == host and url.path.startswith(prefix):
+                if fixture not in bodies:
+                    with open(os.path.join(FIXTURES, fixture), "rb") as f:
+                        bodies[fixture] = f.read()
+                response = requests.Response()
+                response.status_code = 200
+                response._content = bodies[fixture]
+                response.headers["Content-Type"] = content_type
+                response.encoding = "utf-8"
+                response.url = request.url
+                response.request = request
+                return response
+        raise requests.exceptions.ConnectionError(f"No recorded response for {request.url}")
+
+    HTTPAdapter.send = send
+
+def load_module(name):
+    # No uploads from a benchmark; stubbed before the bot binds them
+    import utils.s3_upload
+    for function in ("upload_to_s3", "upload_bot_outputs"):
+        if hasattr(utils.s3_upload, function):
+            setattr(utils.s3_upload, function, lambda *args, **kwargs: [])
+    spec = importlib.util.spec_from_file_location(f"bot_suite.{name}", os.path.join(root, "bots", name, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def bot_config(name, output_dir, symbols=None):
+    with open(os.path.join(root, "bots", name, "config.json")) as f:
+        config = json.load(f)
+    config.update(output_directory=output_dir, skip_unchanged=False, s3_profile="")
+    if symbols:
+        config["symbols"] = symbols
+    if root != project_root:
+        # A revision's worktree is disposable, and trees from before the Bot class read
+        # config.json from the bot's folder when the module is imported
+        with open(os.path.join(root, "bots", name, "config.json"), "w") as f:
+            json.dump(config, f, indent=4)
+    return config
+
+def symbols_for(scale):
+    return ["TSLA"] + [f"TSLA{copy}" for copy in range(1, scale)]
+
+def prepare_bot(module, name, config):
+    bot = getattr(module, "bot", None)
+    if bot is None or not hasattr(bot, "_config"):
+        if root == project_root:
+            raise RuntimeError(f"{name} has no Bot instance to configure")
+        return None
+    import pytz
+    now = pytz.timezone(getattr(bot, "timezone", "America/Los_Angeles")).localize(
+        datetime.strptime(BOTS[name]["now"], "%Y-%m-%d %H:%M"))
+    bot._config = config
+    bot.clock = lambda: now
+    return bot
+
+def run_once(module, bot):
+    # Returns {stage: seconds} when the tree records run metrics
+    if bot is None:
+        module.run_scraper()
+        return {}
+    context = bot.context()
+    if hasattr(bot, "execute"):
+        bot.execute(context)
+    else:
+        bot.run(context)
+    metrics = getattr(context, "metrics", None)
+    return {stage: round(entry.seconds, 4) for stage, entry in metrics.stages.items()} if metrics else {}
+
+def scaled_records(records, key, scale):
+    # Every record repeated scale times, copies side by side so the history stays in time order;
+    # numeric keys are offset and text keys suffixed per copy
+    for record in records:
+        yield record
+        value = record.get(key)
+        if value is None:
+            continue
+        for copy in range(1, scale):
+            yield dict(record, **{key: value + copy * 10000000 if isinstance(value, int) else f"{value} #{copy}"})
+
+def write_history(name, scale, config):
+    spec = BOTS[name]
+    source = os.path.join(project_root, "bots", name, "src", "data", spec["history"])
+    with open(source) as f:
+        records = json.load(f)
+    output_dir = config["output_directory"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    if spec["key"] is None:
+        # One copy of the series per symbol
+        for symbol in config.get("symbols", ["TSLA"]):
+            shutil.copy(source, os.path.join(output_dir, f"{symbol.lower()}_stock.json"))
+        return
+
+    timeseries_file = os.path.join(output_dir, os.path.basename(spec["history"]))
+    rows = scaled_records(records, spec["key"], scale)
+    try:
+        from utils.timeseries import append_timeseries
+    except ImportError:
+        append_timeseries = None
+    if append_timeseries is None:
+        # Trees without the append-only store keep the whole history in one JSON file
+        with open(timeseries_file, "w") as f:
+            f.write("[")
+            for position, record in enumerate(rows):
+                f.write(("," if position else "") + json.dumps(record))
+            f.write("]")
+        return
+
+    import pandas as pd
+    from itertools import islice
+    keys = config.get("timeseries_keys") or None
+    partition_column = config.get("timeseries_partition_column")
+    while True:
+        chunk = list(islice(rows, CHUNK_ROWS))
+        if not chunk:
+            return
+        frame = pd.DataFrame(chunk)
+        if partition_column:
+            append_timeseries(frame, timeseries_file, keys, partition_column)
+        else:
+            append_timeseries(frame, timeseries_file, keys)
+
+def warm_imports():
+    # Bots import pandas and pyarrow lazily; benchmarks/startup.py measures that, so it stays out of the stages
+    import pandas  # noqa: F401
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        pass
+
+def worker(mode, name, scale, output_dir, result_file):
+    install_replay()
+    config = bot_config(name, output_dir, symbols_for(scale) if BOTS[name]["key"] is None else None)
+    module = load_module(name)
+    bot = prepare_bot(module, name, config)
+    if mode == "prepare":
+        write_history(name, scale, config)
+    warm_imports()
+    start = time.perf_counter()
+    stages = run_once(module, bot)
+    seconds = time.perf_counter() - start
+    with open(result_file, "w") as f:
+        json.dump({"seconds": round(seconds, 4), "peak_rss_mb": round(peak_rss_mb(), 1), "stages": stages}, f)
+
+# --- Driver side ---
+
+def call_worker(tree, mode, name, scale, output_dir):
+    result_file = os.path.join(os.path.dirname(output_dir), f"{name}-{scale}-{mode}.json")
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--root", tree,
+         "--worker", mode, name, str(scale), output_dir, result_file],
+        capture_output=True, text=True,
+        # Relative paths in a tree's bots resolve under the temporary directory, never in this checkout
+        cwd=os.path.dirname(output_dir),
+    )
+    if result.returncode != 0:
+        tail = "\n".join((result.stdout + result.stderr).strip().splitlines()[-15:])
+        raise RuntimeError(f"{name} x{scale} ({mode}) failed in {tree}:\n{tail}")
+    with open(result_file) as f:
+        return json.load(f)
+
+def run_suite(tree, bots, scales, repeat=1, label=None):
+    # {"bot xscale": best of `repeat` timed runs}
+    results = {}
+    print(f"\n{label or tree}")
+    print(f"{'bot':<18}{'scale':>6}{'seconds':>10}{'peak MB':>10}  stages (s)")
+    for name in bots:
+        for scale in scales:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                prepared = os.path.join(tmp_dir, "prepared")
+                call_worker(tree, "prepare", name, scale, prepared)
+                runs = []
+                for attempt in range(repeat):
+                    output_dir = os.path.join(tmp_dir, f"run{attempt}")
+                    shutil.copytree(prepared, output_dir)
+                    runs.append(call_worker(tree, "run", name, scale, output_dir))
+                    shutil.rmtree(output_dir)
+            best = min(runs, key=lambda run: run["seconds"])
+            best["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+            results[f"{name} x{scale}"] = best
+            stages = " ".join(f"{stage}={best['stages'][stage]:.3f}"
+                              for stage in SHOWN_STAGES if stage in best["stages"])
+            print(f"{name:<18}{scale:>6}{best['seconds']:>10.3f}{best['peak_rss_mb']:>10.1f}  {stages}")
+    return results
+
+def regressions(base, head, threshold=DEFAULT_THRESHOLD):
+    # [(run, measure, base value, head value)] where head is worse beyond the threshold and the noise floor
+    found = []
+    for run in base.keys() & head.keys():
+        for measure, floor in (("seconds", MIN_SECONDS), ("peak_rss_mb", MIN_RSS_MB)):
+            before, after = base[run][measure], head[run][measure]
+            if after > before * (1 + threshold) and after - before > floor:
+                found.append((run, measure, before, after))
+        for stage, after in head[run]["stages"].items():
+            before = base[run]["stages"].get(stage)
+            if before is not None and after > before * (1 + threshold) and after - before > MIN_SECONDS:
+                found.append((run, f"stage {stage}", before, after))
+    return sorted(found)
+
+def print_comparison(base, head, base_label, head_label):
+    print(f"\nbefore: {base_label}, after: {head_label}")
+    print(f"{'run':<24}{'seconds before':>16}{'after':>10}{'change':>9}{'peak MB before':>16}{'after':>8}")
+    for run in sorted(base.keys() & head.keys()):
+        before, after = base[run], head[run]
+        change = (after["seconds"] - before["seconds"]) / before["seconds"] * 100 if before["seconds"] else 0
+        print(f"{run:<24}{before['seconds']:>16.3f}{after['seconds']:>10.3f}{change:>8.0f}%"
+              f"{before['peak_rss_mb']:>16.1f}{after['peak_rss_mb']:>8.1f}")
+
+def add_worktree(revision, tmp_dir):
+    path = os.path.join(tmp_dir, revision.replace("/", "_").replace("~", "-").replace("^", "-"))
+    subprocess.run(["git", "-C", project_root, "worktree", "add", "--detach", path, revision],
+                   check=True, capture_output=True, text=True)
+    return path
+
+def remove_worktree(path):
+    subprocess.run(["git", "-C", project_root, "worktree", "remove", "--force", path], capture_output=True)
+
+def compare(base_revision, head_revision, bots, scales, repeat, threshold):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trees = []
+        try:
+            base_tree = add_worktree(base_revision, tmp_dir)
+            trees.append(base_tree)
+            if head_revision:
+                head_tree = add_worktree(head_revision, tmp_dir)
+                trees.append(head_tree)
+            else:
+                head_tree = project_root
+            head_label = head_revision or "working tree"
+            base = run_suite(base_tree, bots, scales, repeat, base_revision)
+            head = run_suite(head_tree, bots, scales, repeat, head_label)
+        finally:
+            for tree in trees:
+                remove_worktree(tree)
+
+    print_comparison(base, head, base_revision, head_label)
+    found = regressions(base, head, threshold)
+    if found:
+        print(f"\nRegressions ({head_label} vs {base_revision}, threshold {threshold:.0%}):")
+        for run, measure, before, after in found:
+            print(f"  {run}: {measure} {before:.3f} -> {after:.3f}")
+    else:
+        print(f"\nNo regressions beyond {threshold:.0%}")
+    return {"base": base, "head": head, "regressions": found}
+
+def values_after(args, flag):
+    # The arguments following a flag, up to the next flag
+    if flag not in args:
+        return []
+    values = []
+    for arg in args[args.index(flag) + 1:]:
+        if arg.startswith("--"):
+            break
+        values.append(arg)
+    return values
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--worker" in args:
+        mode, name, scale, output_dir, result_file = values_after(args, "--worker")
+        worker(mode, name, int(scale), output_dir, result_file)
+        sys.exit(0)
+
+    bots = values_after(args, "--bots") or list(BOTS)
+    scales = [int(scale) for scale in values_after(args, "--scales")] or DEFAULT_SCALES
+    repeat = int(values_after(args, "--repeat")[0]) if "--repeat" in args else 1
+    threshold = float(values_after(args, "--threshold")[0]) if "--threshold" in args else DEFAULT_THRESHOLD
+
+    if "--compare" in args:
+        revisions = values_after(args, "--compare")
+        results = compare(revisions[0], revisions[1] if len(revisions) > 1 else None, bots, scales, repeat, threshold)
+        failed = bool(results["regressions"])
+    else:
+        results = run_suite(project_root, bots, scales, repeat, "working tree")
+        failed = False
+
+    if "--save" in args:
+        with open(values_after(args, "--save")[0], "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,68 @@
+import sys
+import os
+
+# Add the project root directory to Python's path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import time
+import tempfile
+import pandas as pd
+from utils.output import write_outputs
+
+# Compare file size and read/write time of each output format on the existing timeseries files.
+# Usage: python benchmarks/output_formats.py [timeseries_file ...] [--repeat N]
+
+DEFAULT_FILES = [
+    os.path.join(project_root, "bots/crumbl_menu/src/data/crumbl_menu_timeseries.json"),
+    os.path.join(project_root, "bots/la_outages/src/data/la_outages_timeseries.json"),
+]
+
+# (label, format, options, reader)
+CASES = [
+    ("json (indent=4)", None, {}, lambda path: pd.read_json(path)),
+    ("json (compact)", "json", {}, lambda path: pd.read_json(path)),
+    ("parquet (snappy)", "parquet", {"parquet_compression": "snappy"}, lambda path: pd.read_parquet(path, engine="fastparquet")),
+    ("parquet (zstd)", "parquet", {"parquet_compression": "zstd"}, lambda path: pd.read_parquet(path, engine="fastparquet")),
+    ("csv", "csv", {}, lambda path: pd.read_csv(path)),
+]
+
+def _best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def benchmark_file(timeseries_file, repeat=3):
+    df = pd.read_json(timeseries_file)
+    print(f"\n{os.path.relpath(timeseries_file, project_root)} ({len(df)} rows)")
+    print(f"{'format':<18}{'size (KB)':>12}{'write (ms)':>12}{'read (ms)':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_path = os.path.join(tmp_dir, "timeseries")
+        for label, fmt, options, reader in CASES:
+            if fmt is None:
+                # The legacy pretty-printed layout the bots used to write
+                path = f"{base_path}.legacy.json"
+                write = lambda: df.to_json(path, orient="records", indent=4)
+            else:
+                path = f"{base_path}.{fmt}"
+                write = lambda: write_outputs(df, base_path, [fmt], options)
+
+            write_time = _best_of(write, repeat)
+            read_time = _best_of(lambda: reader(path), repeat)
+            size_kb = os.path.getsize(path) / 1024
+            print(f"{label:<18}{size_kb:>12.1f}{write_time * 1000:>12.1f}{read_time * 1000:>12.1f}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 3
+    if "--repeat" in args:
+        index = args.index("--repeat")
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+
+    for timeseries_file in args or DEFAULT_FILES:
+        benchmark_file(timeseries_file, repeat)
@@ -0,0 +1,101 @@
+import sys
+import os
+
+# Add the project root directory to Python's path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.fetch import fetch_all
+
+# Measure fetch_all() throughput against a local stub server that mimics slow TikTok profile pages.
+# Usage: python benchmarks/parallel_fetch.py [--users N] [--latency SECONDS] [--workers N ...]
+
+PAGE_TEMPLATE = (
+    '<html><head></head><body>'
+    '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">{payload}</script>'
+    '</body></html>'
+)
+
+def _profile_page(username):
+    payload = {
+        "__DEFAULT_SCOPE__": {
+            "webapp.user-detail": {
+                "userInfo": {
+                    "user": {"uniqueId": username, "nickname": username.title()},
+                    "stats": {"followerCount": len(username) * 1000},
+                }
+            }
+        }
+    }
+    return PAGE_TEMPLATE.format(payload=json.dumps(payload))
+
+def start_stub_server(latency):
+    class ProfileHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            username = self.path.lstrip("/@")
+            # Users starting with "missing" get a page without the data tag
+            body = "<html></html>" if username.startswith("missing") else _profile_page(username)
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ProfileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(users=100, latency=0.05, worker_counts=(1, 4, 8, 16)):
+    # Import here so the bot's config is only loaded when the benchmark actually runs
+    sys.path.insert(0, os.path.join(project_root, "bots", "tiktok_followers"))
+    from main import parse_profile
+
+    server = start_stub_server(latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    usernames = [f"missing{i}" if i % 25 == 0 else f"user{i}" for i in range(users)]
+    urls = [f"{base_url}/@{username}" for username in usernames]
+
+    print(f"{users} users, {latency * 1000:.0f} ms simulated latency")
+    print(f"{'workers':>8}{'seconds':>10}{'req/s':>10}{'errors':>8}")
+    for workers in worker_counts:
+        start = time.perf_counter()
+        results = fetch_all(urls, parse=parse_profile, max_workers=workers)
+        elapsed = time.perf_counter() - start
+
+        # Results must line up with the input order and errors must be reported per user
+        for username, result in zip(usernames, results):
+            if username.startswith("missing"):
+                assert result.error is not None, username
+            else:
+                assert result.data["user"]["uniqueId"] == username, (username, result)
+        errors = sum(1 for result in results if result.error)
+        print(f"{workers:>8}{elapsed:>10.2f}{users / elapsed:>10.1f}{errors:>8}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    if "--users" in args:
+        options["users"] = int(args[args.index("--users") + 1])
+    if "--latency" in args:
+        options["latency"] = float(args[args.index("--latency") + 1])
+    if "--workers" in args:
+        index = args.index("--workers") + 1
+        counts = []
+        while index < len(args) and not args[index].startswith("--"):
+            counts.append(int(args[index]))
+            index += 1
+        options["worker_counts"] = counts
+    run(**options)
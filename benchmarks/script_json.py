@@ -0,0 +1,67 @@
+import sys
+import os
+
+# Add the project root directory to Python's path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import re
+import json
+import time
+from bs4 import BeautifulSoup
+from utils.script_json import extract_script_json
+
+# Compare the single-scan script tag extractor with a full BeautifulSoup parse on saved pages.
+# Usage: python benchmarks/script_json.py [--scale N] [--repeat N]
+#   --scale repeats each page's body markup N times to simulate multi-MB pages
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# (fixture file, script tag id)
+FIXTURES = [
+    ("crumbl_menu.html", "__NEXT_DATA__"),
+    ("tiktok_profile.html", "__UNIVERSAL_DATA_FOR_REHYDRATION__"),
+]
+
+def soup_extract(html, script_id):
+    # What the bots did before utils/script_json.py
+    script_tag = BeautifulSoup(html, "html.parser").find("script", id=script_id)
+    return json.loads(re.search(r"\{.*\}", script_tag.string).group(0))
+
+def _scaled(html, scale):
+    if scale <= 1:
+        return html
+    body_start = html.index("<body>") + len("<body>")
+    script_start = html.rindex("<script id=")
+    return html[:body_start] + html[body_start:script_start] * scale + html[script_start:]
+
+def _best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(scale=1, repeat=5):
+    print(f"{'fixture':<22}{'size (KB)':>11}{'soup (ms)':>11}{'fast (ms)':>11}{'speedup':>9}")
+    for filename, script_id in FIXTURES:
+        with open(os.path.join(FIXTURES_DIR, filename), "r") as f:
+            html = _scaled(f.read(), scale)
+
+        # Both paths must agree before their timings mean anything
+        assert extract_script_json(html, script_id) == soup_extract(html, script_id)
+
+        soup_time = _best_of(lambda: soup_extract(html, script_id), repeat)
+        fast_time = _best_of(lambda: extract_script_json(html, script_id), repeat)
+        print(f"{filename:<22}{len(html) / 1024:>11.1f}{soup_time * 1000:>11.2f}"
+              f"{fast_time * 1000:>11.2f}{soup_time / fast_time:>8.0f}x")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    if "--scale" in args:
+        options["scale"] = int(args[args.index("--scale") + 1])
+    if "--repeat" in args:
+        options["repeat"] = int(args[args.index("--repeat") + 1])
+    run(**options)
@@ -0,0 +1,82 @@
+import sys
+import os
+
+# Add the project root directory to Python's path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import json
+import subprocess
+from utils.runner import BOTS_DIR, discover_bots
+
+# Cold-start budget check for the bots, based on `python -X importtime`.
+#
+# Each bot's main.py is imported in a fresh interpreter, and the cumulative
+# time of its top-level imports is compared with "startup_budget_ms" from the
+# bot's config.json (DEFAULT_BUDGET_MS when unset). The script exits non-zero
+# when any bot goes over its budget, so it can gate CI.
+# Usage: python benchmarks/startup.py [bot ...] [--repeat N]
+
+DEFAULT_BUDGET_MS = 400
+
+IMPORT_BOT = (
+    "import importlib.util, sys; "
+    "spec = importlib.util.spec_from_file_location('bot_main', sys.argv[1]); "
+    "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+)
+
+def measure_imports(bot_path):
+    # Returns {top-level module: cumulative microseconds} for one cold import of the bot
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_BOT, bot_path],
+        capture_output=True, text=True, cwd=project_root,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {bot_path} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented; only top-level ones add up to the total
+        if not name.startswith("  "):
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+def startup_budget(bot_name):
+    config_path = os.path.join(BOTS_DIR, bot_name, "config.json")
+    with open(config_path, "r") as f:
+        return json.load(f).get("startup_budget_ms", DEFAULT_BUDGET_MS)
+
+def run(bots=None, repeat=3):
+    over_budget = []
+    print(f"{'bot':<22}{'startup (ms)':>14}{'budget (ms)':>13}  slowest imports")
+    for bot_name in bots or discover_bots():
+        bot_path = os.path.join(BOTS_DIR, bot_name, "main.py")
+        # Best of several runs to smooth out disk cache and scheduler noise
+        runs = [measure_imports(bot_path) for _ in range(repeat)]
+        timings = min(runs, key=lambda timing: sum(timing.values()))
+        total_ms = sum(timings.values()) / 1000
+        budget_ms = startup_budget(bot_name)
+
+        slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:3]
+        slowest_text = ", ".join(f"{name} {micros / 1000:.0f}" for name, micros in slowest)
+        flag = "" if total_ms <= budget_ms else "  OVER BUDGET"
+        print(f"{bot_name:<22}{total_ms:>14.1f}{budget_ms:>13}  {slowest_text}{flag}")
+        if total_ms > budget_ms:
+            over_budget.append(bot_name)
+
+    if over_budget:
+        print(f"\nStartup over budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 3
+    if "--repeat" in args:
+        index = args.index("--repeat")
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+    sys.exit(run(args or None, repeat))
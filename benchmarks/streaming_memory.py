@@ -0,0 +1,90 @@
+import sys
+import os
+
+# Add the project root directory to Python's path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import time
+import random
+import resource
+import tempfile
+import subprocess
+from utils.jsonl import append_records, iter_records, daily_max
+
+# Peak memory of a daily-max aggregate over a synthetic la_outages history.
+#
+# "stream" folds the records one line at a time with utils/jsonl.py; "pandas"
+# loads the store with pd.read_json(lines=True) and groups it. Each pass runs
+# in a fresh interpreter so its peak RSS is its own. The streaming pass should
+# stay flat as the history grows; pass --sizes-mb 250 1000 to check a 1 GB
+# history (generating it takes a few minutes).
+# Usage: python benchmarks/streaming_memory.py [--sizes-mb 25 100]
+
+CITIES = ["Hyde Park", "Montecito Heights", "Van Nuys", "Sylmar", "Venice", "Eagle Rock",
+          "Boyle Heights", "Canoga Park", "Wilmington", "Highland Park"]
+STATUSES = ["Crews Working", "Crews Dispatched", "Assessing", "Restored"]
+
+def synthetic_outages(size_bytes):
+    # Rows shaped like la_outages_timeseries, about 200 bytes each, ten minutes apart
+    rng = random.Random(0)
+    rows = size_bytes // 200
+    for i in range(rows):
+        minutes = i // 5 * 10
+        yield {
+            "id": 50000 + i % 400,
+            "name": rng.choice(CITIES),
+            "rank": rng.randint(1, 3),
+            "affected": rng.randint(1, 2500),
+            "status": rng.choice(STATUSES),
+            "est_fixed": "11/03/2024 17:00",
+            "longitude": round(-118.5 + rng.random() * 0.5, 6),
+            "latitude": round(33.9 + rng.random() * 0.4, 6),
+            "fetched": f"2024-{1 + minutes // 43200 % 12:02d}-{1 + minutes // 1440 % 28:02d} "
+                       f"{minutes // 60 % 24:02d}:{minutes % 60:02d}:00.000000-08:00",
+        }
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def worker(method, path):
+    start = time.perf_counter()
+    if method == "stream":
+        maxima = daily_max(iter_records(path), "fetched", "affected")
+        days = len(maxima)
+    else:
+        import pandas as pd
+        df = pd.read_json(path, lines=True, convert_dates=False, dtype=False)
+        days = len(df.groupby(df["fetched"].str[:10])["affected"].max())
+    print(f"{days} {time.perf_counter() - start:.2f} {peak_rss_mb():.1f}")
+
+def measure(method, path):
+    result = subprocess.run(
+        [sys.executable, __file__, "--worker", method, path],
+        capture_output=True, text=True, check=True,
+    )
+    days, seconds, peak = result.stdout.split()
+    return int(days), float(seconds), float(peak)
+
+def run(sizes_mb=(25, 100)):
+    print(f"{'history (MB)':>12}{'method':>8}{'seconds':>10}{'peak RSS (MB)':>15}")
+    for size_mb in sizes_mb:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "la_outages_timeseries.jsonl")
+            append_records(path, synthetic_outages(size_mb * 1024 * 1024))
+            actual_mb = os.path.getsize(path) / (1024 * 1024)
+            results = {method: measure(method, path) for method in ("stream", "pandas")}
+            assert results["stream"][0] == results["pandas"][0], results
+            for method, (_, seconds, peak) in results.items():
+                print(f"{actual_mb:>12.0f}{method:>8}{seconds:>10.2f}{peak:>15.1f}")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--worker" in args:
+        worker(args[args.index("--worker") + 1], args[args.index("--worker") + 2])
+    elif "--sizes-mb" in args:
+        run([int(arg) for arg in args[args.index("--sizes-mb") + 1:]])
+    else:
+        run()
@@ -8,116 +8,99 @@ project_root = os.path.abspath(os.path.join(script_dir, '../../'))
 # Add the project root directory to Python’s path
 sys.path.insert(0, project_root)  # Use insert(0, ...) to prioritize this path
 
-import json
-import requests
-import pytz
-import pandas as pd
-from datetime import datetime
-from bs4 import BeautifulSoup
-from utils.s3_upload import upload_to_s3  # Import after adding project root to path
-
-# Load configuration settings
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if not os.path.exists(config_path):
-        print(f"Error: Config file not found at {config_path}")
-        exit(1)
-    with open(config_path, "r") as config_file:
-        return json.load(config_file)
-
-config = load_config()
-
-# Time variables, adjusted for Pacific time zone
-pacific = pytz.timezone('America/Los_Angeles')
-now = datetime.now(pacific)
-TODAY = pd.Timestamp(now).strftime("%Y-%m-%d")
-
-# Load configuration settings
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if not os.path.exists(config_path):
-        print(f"Error: Config file not found at {config_path}")
-        exit(1)
-    with open(config_path, "r") as config_file:
-        return json.load(config_file)
-
-config = load_config()
-
-def run_scraper():
-    # Load configuration settings from config.json
-    output_dir = config.get("output_directory")
-    bot_slug = config.get("bot_name")
-    s3_profile = config.get("s3_profile")
-    timeseries_file = os.path.join(output_dir, f"{bot_slug}_timeseries.json")  # Set timeseries file path
- 
-    # Initialize data lists
-    timeseries_data = []
-    cookies_list = []
-
-    # Example data fetch from the website
-    url = 'https://crumblcookies.com/'
-    resp = requests.get(url)
-    content = BeautifulSoup(resp.text, 'html.parser')
-    script_tag = content.find('script', id='__NEXT_DATA__')
-    json_data = json.loads(script_tag.text)
-
-    cookies = json_data['props']['pageProps']['products']['cookies']
-
-    for cookie in cookies:
-        calorie_info = cookie['calorieInformation']
-        cookies_list.append({
-            'status': cookie['status'],
-            'cookie': cookie['name'],
-            'description': cookie['description'],
-            'image': cookie['aerialImage'],
-            'calories_serving': calorie_info['perServing'],
-            'calories_total': calorie_info['total'],
-            'date': TODAY,
-            'fetched': TODAY,
-        })
-        timeseries_data.append({
-            'status': cookie['status'],
-            'cookie': cookie['name'],
-            'description': cookie['description'],
-            'image': cookie['aerialImage'],
-            'calories_serving': calorie_info['perServing'],
-            'calories_total': calorie_info['total'],
-            'date': TODAY,
-            'fetched': TODAY,
-        })
-
-    # Save the main data file
-    df = pd.DataFrame(cookies_list)
-    os.makedirs(output_dir, exist_ok=True)
-    df.to_json(f'{output_dir}/{bot_slug}.json', indent=4, orient='records')
-
-    # Update and save the timeseries data
-    update_timeseries(timeseries_data, timeseries_file)
-
-    # Upload the entire output directory to S3 (this includes both the main and timeseries files)
-    upload_to_s3(output_dir, bot_slug, s3_profile)
-
-def update_timeseries(timeseries_data, timeseries_file):
-    ts_df = pd.read_json(timeseries_file)    
-    ts_df["fetched"] = pd.to_datetime(ts_df["fetched"]).dt.strftime("%Y-%m-%d")
+from utils.bot import Bot, Unchanged  # Import after adding project root to path
+from utils.s3_upload import upload_bot_outputs
+from utils.http import client_from_config
+from utils.output import write_bot_outputs
+from utils.script_json import extract_script_json
+from utils.timeseries import append_timeseries
+from utils.metrics import file_bytes, timed
+from utils.records import build_frames, records_at
+
+class CrumblMenuBot(Bot):
+    def fetch(self, context):
+        # Load configuration settings from config.json
+        config = context.config
+        output_dir = config.get("output_directory")
+        bot_slug = config.get("bot_name")
+
+        # Example data fetch from the website. With "skip_unchanged", an unchanged page skips everything;
+        # it's off here, since the timeseries gets a row per cookie every day, even when the menu is the same
+        client = client_from_config(config, output_dir)
+        url = 'https://crumblcookies.com/'
+        conditional = config.get("skip_unchanged", False) and os.path.exists(f'{output_dir}/{bot_slug}.json')
+        with context.metrics.stage("fetch") as fetch:
+            resp = client.get(url, conditional=conditional)
+            fetch.add(bytes=client.bytes_received)
+        if resp.not_modified:
+            raise Unchanged(f"{url} not modified since the last run")
+        resp.raise_for_status()
+        return client, resp
+
+    def process(self, context, fetched):
+        client, resp = fetched
+        config = context.config
+        output_dir = config.get("output_directory")
+        bot_slug = config.get("bot_name")
+        timeseries_file = os.path.join(output_dir, f"{bot_slug}_timeseries.json")  # Set timeseries file path
+
+        with context.metrics.stage("parse") as parse:
+            json_data = extract_script_json(resp.text, '__NEXT_DATA__')
+            cookies = records_at(json_data, config)
+            parse.add(rows=len(cookies))
+
+        # Stop before writing anything if the menu is the same as last run's
+        fingerprint = self.check_changed(context, output_dir, cookies)
+
+        # The archive and timeseries columns are declared under "fields" in config.json
+        with context.metrics.stage("transform") as transform:
+            df, timeseries_df = build_frames(cookies, config, {'date': context.today, 'fetched': context.today})
+            transform.add(rows=len(df))
+
+        with context.metrics.stage("write") as write:
+            # Save the main data file
+            os.makedirs(output_dir, exist_ok=True)
+            written = write_bot_outputs(df, f'{output_dir}/{bot_slug}.json', config)
+            write.add(bytes=file_bytes(written), rows=len(df))
+
+            # Update and save the timeseries data
+            update_timeseries(timeseries_df, timeseries_file, config.get("timeseries_keys"),
+                              config.get("timeseries_partition_column"))
+
+        # Remember the page's validators and fingerprint, saved once its outputs are uploaded
+        self.after_upload(context, client.save_state)
+        self.record_fingerprint(context, output_dir, fingerprint)
+        return output_dir
+
+    def upload(self, context, output_dir):
+        # Upload the entire output directory to S3 (this includes both the main and timeseries files)
+        with context.metrics.stage("upload") as upload:
+            upload.add(files=len(upload_bot_outputs(output_dir, context.config) or []))
+
+@timed("timeseries")
+def update_timeseries(timeseries_data, timeseries_file, key_columns=None, partition_column=None):
+    import pandas as pd
 
     # Convert new data into a DataFrame
     new_data = pd.DataFrame(timeseries_data)
+    if new_data.empty:
+        return
 
-    # Concatenate with the existing data and remove duplicates
-    updated_ts_df = pd.concat([ts_df, new_data], ignore_index=True)
+    # Parse the dates once, with an explicit format, and derive the calendar columns for the new rows only
+    dates = pd.to_datetime(new_data["date"], format="%Y-%m-%d")
+    new_data["date"] = dates.dt.strftime("%Y-%m-%d")
+    new_data["week"] = dates.dt.isocalendar().week.astype(str)
+    new_data["year"] = dates.dt.year.astype(str)
+    new_data['fetched'] = new_data['fetched'].astype(str)
 
-    updated_ts_df["date"] = pd.to_datetime(updated_ts_df["date"]).dt.strftime("%Y-%m-%d")
-    updated_ts_df["week"] = pd.to_datetime(updated_ts_df["date"]).dt.isocalendar().week
-    updated_ts_df["year"] = pd.to_datetime(updated_ts_df["date"]).dt.year
-    
-    updated_ts_df.drop_duplicates(subset=['date', 'cookie'], keep='last', inplace=True)
-    updated_ts_df['fetched'] = updated_ts_df['fetched'].astype(str)
-    updated_ts_df['week'] = updated_ts_df['week'].astype(str)
-    updated_ts_df['year'] = updated_ts_df['year'].astype(str)
+    # Append to the timeseries store; duplicates on the key columns resolve to the latest row
+    append_timeseries(new_data, timeseries_file, key_columns or ['date', 'cookie'], partition_column)
 
-    # Save the updated timeseries data locally
-    updated_ts_df.to_json(timeseries_file, indent=4, orient='records')
+bot = CrumblMenuBot(script_dir)
+
+def run_scraper():
+    # Kept for callers that use the module-level entry point
+    bot.run(bot.context())
 
 if __name__ == "__main__":
-    run_scraper()
\ No newline at end of file
+    bot.main()
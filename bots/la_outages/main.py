@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 
 # Set the project root directory dynamically based on the file’s location
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -8,109 +9,133 @@ project_root = os.path.abspath(os.path.join(script_dir, '../../'))
 # Add the project root directory to Python’s path
 sys.path.insert(0, project_root)  # Use insert(0, ...) to prioritize this path
 
-import json
-import requests
-import pytz
-import pandas as pd
-from datetime import datetime
-from utils.s3_upload import upload_to_s3  # Import after adding project root to path
-
-
-# Load configuration settings
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if not os.path.exists(config_path):
-        print(f"Error: Config file not found at {config_path}")
-        exit(1)
-    with open(config_path, "r") as config_file:
-        return json.load(config_file)
-
-config = load_config()
-
-# Time settings
-pacific = pytz.timezone('America/Los_Angeles')
-now = datetime.now(pacific)
-TODAY = pd.Timestamp(now).strftime("%Y-%m-%d")
+from utils.bot import Bot  # Import after adding project root to path
+from utils.s3_upload import upload_bot_outputs
+from utils.http import client_from_config
+from utils.arcgis import FeatureLayer
+from utils.fetch import DEFAULT_MAX_WORKERS
+from utils.output import write_bot_outputs
+from utils.timeseries import append_timeseries, migrate_timeseries
+from utils.events import EventLog, rebuild_from_snapshots
+from utils.jsonl import iter_timeseries_records
+from utils.rollups import write_rollups, runs_from_events, runs_from_snapshots, DEFAULT_ROLLUP_HOURS
+from utils.spatial import DEFAULT_CELL_SIZE
+from utils.metrics import file_bytes, timed
+from utils.records import build_frame
+from datetime import timedelta
+
+class LaOutagesBot(Bot):
+    def fetch(self, context):
+        # Load config variables
+        config = context.config
+
+        # Fetch every outage from the FeatureServer; results past maxRecordCount are paged in concurrently
+        client = client_from_config(config)
+        layer = FeatureLayer(
+            config.get("api_url"),
+            client,
+            max_workers=config.get("max_workers", DEFAULT_MAX_WORKERS),
+            rate_limit=config.get("rate_limit_per_host"),
+        )
+        with context.metrics.stage("fetch") as fetch:
+            features = layer.query(config.get("params", {}))
+            fetch.add(bytes=client.bytes_received, rows=len(features))
+        print(f"Fetched {len(features)} outages")
+        return features
+
+    def process(self, context, features):
+        config = context.config
+        output_dir = config.get("output_directory")
+        bot_slug = config.get("bot_name")
+        timeseries_file = os.path.join(output_dir, f"{bot_slug}_timeseries.json")
+
+        # Stop before writing anything if the outage list is the same as last run's
+        fingerprint = self.check_changed(context, output_dir, features)
+
+        # Attributes and point geometry straight into columns, as declared under "fields" in config.json
+        with context.metrics.stage("transform") as transform:
+            if not features:
+                print("No current outages found.")
+            outages_df = build_frame(features, config.get("fields", {}), {"fetched": context.now})
+            transform.add(rows=len(outages_df))
+
+        with context.metrics.stage("write") as write:
+            # Save primary data
+            os.makedirs(output_dir, exist_ok=True)
+            written = write_bot_outputs(outages_df, f'{output_dir}/{bot_slug}.json', config)
+            write.add(bytes=file_bytes(written), rows=len(outages_df))
+
+            # Record what changed since the last run, or append the whole snapshot to the timeseries
+            event_log = None
+            if config.get("track_events"):
+                events_file = os.path.join(output_dir, f"{bot_slug}_events.json")
+                event_log = update_events(outages_df, events_file, timeseries_file, config, context.now)
+            else:
+                update_timeseries(outages_df, timeseries_file, config.get("timeseries_keys"),
+                                  config.get("timeseries_partition_column"))
+
+        # Small pre-aggregated companion files (per city, grid cell and hour) for maps and charts
+        if config.get("rollups"):
+            with context.metrics.stage("rollups") as rollups:
+                start = str(context.now - timedelta(hours=config.get("rollup_hours", DEFAULT_ROLLUP_HOURS)))
+                if event_log is not None:
+                    runs = runs_from_events(event_log, "affected", start)
+                else:
+                    history = iter_timeseries_records(timeseries_file, "fetched", start, None,
+                                                      config.get("timeseries_partition_column"))
+                    runs = runs_from_snapshots(history, "affected")
+                written = write_rollups(outages_df, f'{output_dir}/{bot_slug}.json', "affected", {"city": "name"},
+                                        config.get("rollup_cell_size", DEFAULT_CELL_SIZE),
+                                        config.get("rollup_h3_resolution"), runs)
+                rollups.add(bytes=file_bytes(written))
+            print(f"Wrote rollups to {', '.join(written)}")
+        self.record_fingerprint(context, output_dir, fingerprint)
+        return output_dir
+
+    def upload(self, context, output_dir):
+        # Upload the output directory to S3
+        with context.metrics.stage("upload") as upload:
+            upload.add(files=len(upload_bot_outputs(output_dir, context.config) or []))
+
+@timed("timeseries")
+def update_timeseries(outages_df, timeseries_file, key_columns=None, partition_column=None):
+    # If no new data, keep existing timeseries as-is
+    if outages_df.empty:
+        return
+
+    new_data = outages_df.copy()
+    new_data['fetched'] = new_data['fetched'].astype(str)
+
+    # Upsert the current snapshot; an outage is identified by its id at each fetch time
+    append_timeseries(new_data, timeseries_file, key_columns or ['id', 'fetched'], partition_column)
+
+@timed("events")
+def update_events(outages_df, events_file, timeseries_file, config, fetched):
+    partition_column = config.get("timeseries_partition_column")
+    event_log = EventLog(events_file, config.get("event_key", "id"),
+                         config.get("event_fields", ["rank", "affected", "status", "est_fixed"]),
+                         partitioned=bool(partition_column))
+
+    # The snapshot timeseries is no longer updated: migrating it removes the legacy file, so it isn't uploaded stale
+    migrate_timeseries(timeseries_file, partition_column=partition_column)
+
+    # The first run carries the snapshot history over, so the events start where it ends
+    if not event_log.exists():
+        history = iter_timeseries_records(timeseries_file, partition_column=partition_column)
+        runs = rebuild_from_snapshots(event_log, history)
+        print(f"Converted {runs} snapshots from {timeseries_file} into events")
+
+    # Plain JSON values, so they compare equal to the replayed ones; no outages closes every open one
+    records = json.loads(outages_df.drop(columns=["fetched"]).to_json(orient="records"))
+    events = event_log.record(records, str(fetched))
+    print(f"Recorded {len(events)} outage events")
+    return event_log
+
+bot = LaOutagesBot(script_dir)
 
 def run_scraper():
-    # Load config variables
-    output_dir = config.get("output_directory")
-    bot_slug = config.get("bot_name")
-    s3_profile = config.get("s3_profile")
-    timeseries_file = os.path.join(output_dir, f"{bot_slug}_timeseries.json")
-
-    # Fetch data from the API
-    url = config.get("api_url")
-    response = requests.get(url, params=config.get("params", {}))
-    
-    data = response.json()
-    print(data)
-
-    # Check if there are any outages (features) in the response
-    features = data.get("features", [])
-    if not features:
-        print("No current outages found.")
-        outages_df = pd.DataFrame(columns=[
-            'id', 'name', 'rank', 'affected', 'status', 'est_fixed', 'longitude', 'latitude', 'fetched'
-        ])  # Empty DataFrame with expected columns
-    else:
-        # Parse features into geometry and attribute data
-        geometry_data = []
-        attributes_data = []
-
-        for feature in features:
-            geometry_data.append(feature["geometry"])
-            attributes_data.append(feature["attributes"])
-
-        # Convert to DataFrames
-        geometry_df = pd.DataFrame(geometry_data)
-        attributes_df = pd.DataFrame(attributes_data)
-
-        # Combine into a single DataFrame
-        outages_df = pd.concat([attributes_df, geometry_df], axis=1).rename(columns={
-            "OBJECTID": "id", 
-            "CITY_NAM": "name", 
-            "OUTAGE_RANK": "rank", 
-            "COUNT_IN_RANK": "affected",
-            "FAC_JOB_STATUS_NAM": "status", 
-            "ETR_DATETIME_CHAR": "est_fixed", 
-            "x": "longitude", 
-            "y": "latitude"
-        })
-
-        outages_df["status"] = outages_df["status"].str.title()
-        outages_df["name"] = outages_df["name"].str.title()
-        outages_df["fetched"] = now
-
-    # Save primary data
-    os.makedirs(output_dir, exist_ok=True)
-    outages_df.to_json(f'{output_dir}/{bot_slug}.json', orient='records', indent=4)
-
-    # Update and save the timeseries
-    update_timeseries(outages_df, timeseries_file)
-
-    # Upload the output directory to S3
-    upload_to_s3(output_dir, bot_slug, s3_profile)
-
-def update_timeseries(outages_df, timeseries_file):
-    # Load existing timeseries data if available
-    if os.path.exists(timeseries_file):
-        ts_df = pd.read_json(timeseries_file)
-    else:
-        ts_df = pd.DataFrame(columns=[
-            'id', 'name', 'rank', 'affected', 'status', 'est_fixed', 'longitude', 'latitude', 'fetched'
-        ])
-
-    # Only concatenate if outages_df is not empty
-    if not outages_df.empty:
-        updated_ts_df = pd.concat([ts_df, outages_df], ignore_index=True)
-    else:
-        updated_ts_df = ts_df  # If no new data, keep existing timeseries as-is
-
-    updated_ts_df['fetched'] = updated_ts_df['fetched'].astype(str)
-
-    # Save updated timeseries
-    updated_ts_df.to_json(timeseries_file, orient='records', indent=4)
+    # Kept for callers that use the module-level entry point
+    bot.run(bot.context())
 
 if __name__ == "__main__":
-    run_scraper()
+    bot.main()
@@ -4,126 +4,118 @@ import os
 # Add the project root directory to Python's path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-import re
-import json
-import pytz
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
-from datetime import datetime
-from utils.s3_upload import upload_to_s3
-
-# Load configuration settings
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if not os.path.exists(config_path):
-        print(f"Error: Config file not found at {config_path}")
-        exit(1)
-    with open(config_path, "r") as config_file:
-        return json.load(config_file)
-
-config = load_config()
-
-# Time variables
-pacific = pytz.timezone('America/Los_Angeles')
-now = datetime.now(pacific)
-TODAY = pd.Timestamp(now).strftime("%Y-%m-%d")
-
-def run_scraper():
-    users = config.get("users", [])
-    
-    # Ensure paths are absolute
-    script_dir = os.path.dirname(__file__)
-    output_dir = os.path.join(script_dir, config.get("output_directory"))
-    bot_slug = config.get("bot_name")
-    s3_profile = config.get("s3_profile")
-    
-    # Use local paths for archive and timeseries files
-    archive_file = os.path.join(output_dir, f"{bot_slug}.json")
-    timeseries_file = os.path.join(output_dir, f"{bot_slug}_timeseries.json")
-
-    data = []
-    timeseries_data = []
-
-    for user in users:
-        url = f'https://www.tiktok.com/@{user}'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        script_tag = soup.find('script', id='__UNIVERSAL_DATA_FOR_REHYDRATION__')
-        if script_tag:
-            script_content = script_tag.string
-            json_match = re.search(r'\{.*\}', script_content)
-            if json_match:
-                json_text = json_match.group(0)
-                try:
-                    json_data = json.loads(json_text)
-                    user_info = json_data['__DEFAULT_SCOPE__']['webapp.user-detail']['userInfo']['user']
-                    user_stats = json_data['__DEFAULT_SCOPE__']['webapp.user-detail']['userInfo']['stats']
-                    user_data = {
-                        'username': user,
-                        'nickname': user_info.get('nickname', ''),
-                        'uniqueId': user_info.get('uniqueId', ''),
-                        'verified': user_info.get('verified', False),
-                        'region': user_info.get('region', ''),
-                        'followerCount': user_stats.get('followerCount', 0),
-                        'followingCount': user_stats.get('followingCount', 0),
-                        'heartCount': user_stats.get('heartCount', 0),
-                        'videoCount': user_stats.get('videoCount', 0),
-                        'diggCount': user_stats.get('diggCount', 0)
-                    }
-                    data.append(user_data)
-                    timeseries_data.append({
-                        'date': TODAY,
-                        'username': user,
-                        'followerCount': user_stats.get('followerCount', 0),
-                        'followingCount': user_stats.get('followingCount', 0),
-                        'heartCount': user_stats.get('heartCount', 0),
-                        'videoCount': user_stats.get('videoCount', 0),
-                        'diggCount': user_stats.get('diggCount', 0)
-                    })
-                except (json.JSONDecodeError, KeyError) as e:
-                    print(f'Error parsing JSON or finding user data for {user}: {e}')
-            else:
-                print(f'Could not extract JSON content for {user}')
-        else:
-            print(f'Could not find script tag for {user}')
-
-    # Ensure the output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Save the collected data locally
-    df = pd.DataFrame(data)
-    df.to_json(archive_file, indent=4, orient='records')
-    
-    # Update the timeseries file locally
-    update_timeseries(timeseries_data, timeseries_file)
-
-    # Upload the saved files to S3
-    upload_to_s3(output_dir, bot_slug, s3_profile)
-
-def update_timeseries(timeseries_data, timeseries_file):
-    # Load existing timeseries data if available
-    if os.path.exists(timeseries_file):
-        ts_df = pd.read_json(timeseries_file)
-    else:
-        ts_df = pd.DataFrame(columns=[
-            'date', 'username', 'followerCount', 'followingCount',
-            'heartCount', 'videoCount', 'diggCount'
-        ])
+from utils.bot import Bot
+from utils.s3_upload import upload_bot_outputs
+from utils.fetch import fetch_all, DEFAULT_MAX_WORKERS
+from utils.http import client_from_config
+from utils.output import write_bot_outputs
+from utils.script_json import extract_script_json
+from utils.timeseries import append_timeseries
+from utils.metrics import file_bytes, timed
+from utils.records import build_frames
+
+def parse_profile(response):
+    # Runs in a fetch worker; raises so the error is reported against the user
+    response.raise_for_status()
+    json_data = extract_script_json(response.text, '__UNIVERSAL_DATA_FOR_REHYDRATION__')
+    # {"user": {...}, "stats": {...}}; the columns taken from it are declared under "fields" in config.json
+    return json_data['__DEFAULT_SCOPE__']['webapp.user-detail']['userInfo']
+
+class TiktokFollowersBot(Bot):
+    def output_dir(self, config):
+        # Ensure paths are absolute: output_directory is relative to the bot's folder
+        return os.path.join(self.bot_dir, config.get("output_directory"))
+
+    def fetch(self, context):
+        config = context.config
+        # Every user, or just this shard's users in a sharded run (see utils/shards.py)
+        users = self.entities(context)
+
+        # Fetch and parse every profile concurrently; results come back in the same order as users
+        # (parsing happens in the fetch workers, so the fetch stage includes it)
+        max_workers = config.get("max_workers", DEFAULT_MAX_WORKERS)
+        client = client_from_config(config)
+        urls = [f'https://www.tiktok.com/@{user}' for user in users]
+        with context.metrics.stage("fetch") as fetch:
+            results = fetch_all(
+                urls,
+                parse=parse_profile,
+                max_workers=max_workers,
+                rate_limit=config.get("rate_limit_per_host"),
+                session=client,
+            )
+            fetch.add(bytes=client.bytes_received, rows=sum(1 for result in results if not result.error))
+        return list(zip(users, results))
+
+    def transform(self, context, fetched):
+        config = context.config
+        with context.metrics.stage("transform") as transform:
+            fetched_users = []
+            profiles = []
+            for user, result in fetched:
+                if result.error:
+                    print(f'Error fetching or parsing data for {user}: {result.error}')
+                    continue
+                fetched_users.append(user)
+                profiles.append(result.data)
+            df, timeseries_df = build_frames(profiles, config, {'username': fetched_users, 'date': context.today})
+            transform.add(rows=len(df))
+        return {"archive": df, "timeseries": timeseries_df}
+
+    def write(self, context, frames):
+        # The frames of a whole run, or of every shard combined by --merge
+        config = context.config
+        df, timeseries_df = frames["archive"], frames["timeseries"]
+
+        output_dir = self.output_dir(config)
+        bot_slug = config.get("bot_name")
+
+        # Use local paths for archive and timeseries files
+        archive_file = os.path.join(output_dir, f"{bot_slug}.json")
+        timeseries_file = os.path.join(output_dir, f"{bot_slug}_timeseries.json")
+
+        # Stop before writing anything if no profile changed since the last run
+        fingerprint = self.check_changed(context, output_dir, df)
+
+        with context.metrics.stage("write") as write:
+            # Ensure the output directory exists
+            os.makedirs(output_dir, exist_ok=True)
+
+            # Save the collected data locally
+            written = write_bot_outputs(df, archive_file, config)
+            write.add(bytes=file_bytes(written), rows=len(df))
+
+            # Update the timeseries file locally
+            update_timeseries(timeseries_df, timeseries_file, config.get("timeseries_keys"),
+                              config.get("timeseries_partition_column"))
+        self.record_fingerprint(context, output_dir, fingerprint)
+        return output_dir
+
+    def upload(self, context, output_dir):
+        # Upload the saved files to S3
+        with context.metrics.stage("upload") as upload:
+            upload.add(files=len(upload_bot_outputs(output_dir, context.config) or []))
+
+@timed("timeseries")
+def update_timeseries(timeseries_data, timeseries_file, key_columns=None, partition_column=None):
+    import pandas as pd
 
     # Convert new data into a DataFrame
-    new_data = pd.DataFrame(timeseries_data)    
-
-    # Concatenate with the existing data and remove duplicates based on date and username
-    updated_ts_df = pd.concat([ts_df, new_data], ignore_index=True)
-    updated_ts_df.drop_duplicates(subset=['date', 'username'], keep='last', inplace=True)
+    new_data = pd.DataFrame(timeseries_data)
+    if new_data.empty:
+        return
 
     # Ensure the 'date' column is consistently formatted as 'YYYY-MM-DD' and is a string type
-    updated_ts_df['date'] = pd.to_datetime(updated_ts_df['date']).dt.strftime('%Y-%m-%d').astype(str)
+    new_data['date'] = pd.to_datetime(new_data['date'], format='%Y-%m-%d').dt.strftime('%Y-%m-%d')
 
-    # Save the updated timeseries data locally
-    updated_ts_df.to_json(timeseries_file, indent=4, orient='records')
+    # Append to the timeseries store; duplicates on date and username resolve to the latest row
+    append_timeseries(new_data, timeseries_file, key_columns or ['date', 'username'], partition_column)
+
+bot = TiktokFollowersBot(os.path.dirname(os.path.abspath(__file__)))
+
+def run_scraper():
+    # Kept for callers that use the module-level entry point
+    bot.run(bot.context())
 
 if __name__ == "__main__":
-    run_scraper()
+    bot.main()
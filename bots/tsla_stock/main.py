@@ -4,108 +4,238 @@ import os
 # Add the project root directory to Python's path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-import json
-# import time # No longer needed after removing Yahoo specific timestamp
-import pytz
-import requests
-import pandas as pd
-from datetime import datetime
-from utils.s3_upload import upload_to_s3
-
-# Time variables, adjusted for the best coast
-pacific = pytz.timezone('America/Los_Angeles')
-now = datetime.now(pacific)
-# timestamp = round(time.time()) # Removed, was for Yahoo API
-TODAY = pd.Timestamp(now).strftime("%Y-%m-%d")
-
-# Load configuration settings
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if not os.path.exists(config_path):
-        print(f"Error: Config file not found at {config_path}")
-        sys.exit(1) # Changed exit(1) to sys.exit(1) for clarity
-    with open(config_path, "r") as config_file:
-        return json.load(config_file)
-
-config = load_config()
+from datetime import date
+from utils.bot import Bot, Unchanged
+from utils.s3_upload import upload_bot_outputs
+from utils.fetch import fetch_all, DEFAULT_MAX_WORKERS
+from utils.http import client_from_config
+from utils.output import write_bot_outputs
+from utils.metrics import file_bytes
+
+# CNN API URL for a symbol's daily closes over a range (5D, 1M, ... 5Y)
+API_URL = 'https://production.dataviz.cnn.io/charting/instruments/{symbol}/{range}/false'
+
+# Range endpoints, shortest first, with the calendar days each one reliably covers
+RANGES = [("5D", 5), ("1M", 28), ("3M", 89), ("6M", 180), ("1Y", 362), ("5Y", 1824)]
+FULL_RANGE = "5Y"
+
+# Stored days fetched again on every run, to catch corrections to recent closes
+OVERLAP_DAYS = 3
+
+# Headers based on CNN example, suitable for their endpoint
+HEADERS = {
+    'accept': '*/*',
+    'origin': 'https://www.cnn.com',
+    'referer': 'https://www.cnn.com/',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36'
+}
+
+def choose_range(last_date, today):
+    # The shortest range reaching back past the last stored date (plus the overlap), or the full range
+    if last_date is None:
+        return FULL_RANGE
+    needed = (today - date.fromisoformat(last_date)).days + OVERLAP_DAYS
+    for name, days in RANGES:
+        if days >= needed:
+            return name
+    return FULL_RANGE
+
+def parse_series(response):
+    # Runs in a fetch worker; a 304 comes back as None
+    if response.not_modified:
+        return None
+    response.raise_for_status()
+    raw_data = response.json()
+
+    # Validate data format (expected: list of dictionaries)
+    if not isinstance(raw_data, list) or not raw_data:
+        raise ValueError("No data or unexpected format received from CNN API. Expected a list of records.")
+    return raw_data
+
+def to_frame(raw_data):
+    import pandas as pd
+
+    # Create DataFrame from the list of dictionaries
+    df = pd.DataFrame(raw_data)
+
+    # Check for required columns before processing
+    if "event_date" not in df.columns or "current_price" not in df.columns:
+        raise KeyError("Required columns 'event_date' or 'current_price' not found in the data")
+
+    # Rename columns to match desired output ('date', 'close')
+    df = df.rename(columns={"event_date": "date", "current_price": "close"})
+
+    # Convert 'date' column from 'YYYY-MM-DDTHH:MM:SSZ' to 'YYYY-MM-DD' string format
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+
+    # Round 'close' prices to 2 decimal places
+    df["close"] = df["close"].round(2)
+
+    # Keep the 'date' and 'close' columns, one row per date, in ascending order
+    df = df[["date", "close"]].drop_duplicates(subset="date", keep="last")
+    return df.sort_values('date', ascending=True).reset_index(drop=True)
+
+def merge_series(stored, fresh):
+    # Returns the merged series, or None if the window leaves a gap or revises a stored close
+    import pandas as pd
+    if stored is None or stored.empty:
+        return fresh
+    if fresh["date"].iloc[0] > stored["date"].iloc[-1]:
+        return None
+
+    overlap = stored.merge(fresh, on="date", suffixes=("_stored", "_fresh"))
+    if ((overlap["close_stored"] - overlap["close_fresh"]).abs() > 0.005).any():
+        return None
+
+    # Older history stays as stored; the window replaces everything it covers
+    older = stored[stored["date"] < fresh["date"].iloc[0]]
+    return pd.concat([older, fresh], ignore_index=True)
+
+def merge_full_series(stored, fresh):
+    # A full refetch replaces its whole window but keeps any history older than it
+    import pandas as pd
+    if stored is None or stored.empty:
+        return fresh
+    older = stored[stored["date"] < fresh["date"].iloc[0]]
+    return pd.concat([older, fresh], ignore_index=True)
+
+class TslaStockBot(Bot):
+    def output_path(self, config, symbol):
+        # TSLA keeps the original tsla_stock.json name
+        return os.path.join(config.get("output_directory"), f"{symbol.lower()}_stock.json")
+
+    def load_series(self, path):
+        if not os.path.exists(path):
+            return None
+        import pandas as pd
+        stored = pd.read_json(path, convert_dates=False, dtype={"date": str})
+        if stored.empty:
+            return None
+        return stored.sort_values("date").reset_index(drop=True)
+
+    def fetch_windows(self, context, client, symbols, ranges, conditional):
+        # One request per symbol, concurrently; results keyed by symbol
+        urls = [API_URL.format(symbol=symbol, range=ranges[symbol]) for symbol in symbols]
+        with context.metrics.stage("fetch") as fetch:
+            received = client.bytes_received
+            results = fetch_all(
+                urls,
+                parse=parse_series,
+                max_workers=context.config.get("max_workers", DEFAULT_MAX_WORKERS),
+                session=client,
+                headers=HEADERS,
+                conditional=conditional,
+            )
+            fetch.add(bytes=client.bytes_received - received)
+        return dict(zip(symbols, results))
+
+    def fetch(self, context):
+        # Configurations pulled from config.json
+        config = context.config
+        output_dir = config.get("output_directory")
+        symbols = [symbol.upper() for symbol in config.get("symbols", ["TSLA"])]
+        client = client_from_config(config, output_dir)
+        today = context.now.date()
+
+        # For every symbol at once, fetch the shortest window covering the days since its last stored close
+        with context.metrics.stage("load"):
+            stored = {symbol: self.load_series(self.output_path(config, symbol)) for symbol in symbols}
+        ranges = {
+            symbol: choose_range(series["date"].iloc[-1] if series is not None else None, today)
+            for symbol, series in stored.items()
+        }
+        # A 304 is only useful with the stored series to fall back on, so ask conditionally only when every output exists
+        conditional = all(series is not None for series in stored.values())
+        results = self.fetch_windows(context, client, symbols, ranges, conditional=conditional)
+        return client, stored, ranges, results
+
+    def process(self, context, fetched):
+        client, stored, ranges, results = fetched
+        config = context.config
+        output_dir = config.get("output_directory")
+
+        updated = {}
+        raw = {}
+        refetch = []
+        for symbol, result in results.items():
+            if result.error:
+                print(f"Error fetching {symbol} ({ranges[symbol]}): {result.error}")
+                continue
+            if result.data is None:
+                print(f"{symbol} {ranges[symbol]} not modified since the last run")
+                continue
+            try:
+                with context.metrics.stage("parse") as parse:
+                    fresh = to_frame(result.data)
+                    parse.add(rows=len(fresh))
+            except (ValueError, KeyError) as e:
+                print(f"Data processing error for {symbol}: {e}")
+                continue
+            with context.metrics.stage("transform"):
+                merged = merge_series(stored[symbol], fresh)
+            if merged is None:
+                # A gap before the window or a revised close: rebuild from the full range
+                print(f"{symbol}: the {ranges[symbol]} window doesn't line up with the stored series; refetching {FULL_RANGE}")
+                refetch.append(symbol)
+                continue
+            updated[symbol] = merged
+            raw[symbol] = result.data
+
+        if refetch:
+            full_results = self.fetch_windows(context, client, refetch, {symbol: FULL_RANGE for symbol in refetch},
+                                              conditional=False)
+            for symbol, result in full_results.items():
+                if result.error:
+                    print(f"Error fetching {symbol} ({FULL_RANGE}): {result.error}")
+                    continue
+                try:
+                    with context.metrics.stage("parse") as parse:
+                        fresh = to_frame(result.data)
+                        parse.add(rows=len(fresh))
+                    with context.metrics.stage("transform"):
+                        updated[symbol] = merge_full_series(stored[symbol], fresh)
+                    raw[symbol] = result.data
+                except (ValueError, KeyError) as e:
+                    print(f"Data processing error for {symbol}: {e}")
+
+        if not updated:
+            if not refetch and all(not result.error and result.data is None for result in results.values()):
+                raise Unchanged("CNN data not modified since the last run")
+            print("Skipping file saving and S3 upload due to earlier errors or no data.")
+            return []
+
+        # Stop before writing anything if every fetched window is the same as last run's
+        fingerprint = self.check_changed(context, output_dir, raw)
 
-def run_scraper():
-    # Configurations pulled from config.json
-    output_dir = config.get("output_directory")
-    bot_slug = config.get("bot_name")
-    s3_profile = config.get("s3_profile")
-    # timeseries_file = config.get("timeseries_file") # Loaded from config but not used in this script's logic
-
-    # CNN API URL for TSLA 5-year data
-    api_url = 'https://production.dataviz.cnn.io/charting/instruments/TSLA/5Y/false'
-
-    # Headers based on CNN example, suitable for their endpoint
-    HEADERS = {
-        'accept': '*/*',
-        'origin': 'https://www.cnn.com',
-        'referer': 'https://www.cnn.com/',
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36'
-    }
-
-    df = None  # Initialize df to handle potential errors before its creation
-
-    try:
-        # Make the request to CNN API
-        response = requests.get(api_url, headers=HEADERS)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4XX or 5XX)
-        raw_data = response.json()
-
-        # Validate data format (expected: list of dictionaries)
-        if not isinstance(raw_data, list) or not raw_data:
-            raise ValueError("No data or unexpected format received from CNN API. Expected a list of records.")
-
-        # Create DataFrame from the list of dictionaries
-        df_temp = pd.DataFrame(raw_data)
-
-        # Check for required columns before processing
-        if "event_date" not in df_temp.columns or "current_price" not in df_temp.columns:
-            raise KeyError("Required columns 'event_date' or 'current_price' not found in the data")
-
-        # Rename columns to match desired output ('date', 'close')
-        df = df_temp.rename(columns={"event_date": "date", "current_price": "close"})
-
-        # Convert 'date' column from 'YYYY-MM-DDTHH:MM:SSZ' to 'YYYY-MM-DD' string format
-        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-
-        # Round 'close' prices to 2 decimal places
-        df["close"] = df["close"].round(2)
-
-        # Select only the 'date' and 'close' columns for the final DataFrame
-        df = df[["date", "close"]]
-
-        # Sort DataFrame by date in ascending order
-        df = df.sort_values('date', ascending=True).reset_index(drop=True)
+        try:
+            with context.metrics.stage("write") as write:
+                os.makedirs(output_dir, exist_ok=True)
+                written = []
+                for symbol, series in updated.items():
+                    print(f"{symbol}: {len(series)} closes through {series['date'].iloc[-1]}")
+                    written += write_bot_outputs(series, self.output_path(config, symbol), config)
+                    write.add(rows=len(series))
+                write.add(bytes=file_bytes(written))
+            print(f"Data successfully saved to {', '.join(written)}")
+            self.after_upload(context, client.save_state)
+            self.record_fingerprint(context, output_dir, fingerprint)
+            return written
+        except Exception as e:
+            print(f"Error during file saving: {e}")
+            return []
 
-        print("Successfully fetched and processed data from CNN:")
-        print(df.tail()) # Print head for brevity, good for logs
+    def upload(self, context, written):
+        # Upload the saved files to S3
+        # utils.s3_upload.upload_bot_outputs can handle a direct file path; a failed upload fails the run
+        with context.metrics.stage("upload") as upload:
+            for path in written:
+                upload.add(files=len(upload_bot_outputs(path, context.config) or []))
 
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-    except (ValueError, KeyError) as ve:
-        print(f"Data processing error: {ve}")
-    except Exception as e:
-        print(f"An unexpected error occurred during data fetching/processing: {e}")
+bot = TslaStockBot(os.path.dirname(os.path.abspath(__file__)))
 
-    # Proceed to save and upload only if df is successfully created and populated
-    if df is not None and not df.empty:
-        try:
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, f"{bot_slug}.json")
-            df.to_json(output_path, indent=4, orient='records')
-            print(f"Data successfully saved to {output_path}")
-
-            # Upload the saved JSON file to S3
-            # utils.s3_upload.upload_to_s3 can handle a direct file path
-            upload_to_s3(output_path, bot_slug, s3_profile)
-        except Exception as e:
-            print(f"Error during file saving or S3 upload: {e}")
-    else:
-        print("Skipping file saving and S3 upload due to earlier errors or no data.")
+def run_scraper():
+    # Kept for callers that use the module-level entry point
+    bot.run(bot.context())
 
 if __name__ == "__main__":
-    run_scraper()
+    bot.main()
@@ -7,10 +7,23 @@ TEMPLATE_BOT_DIR = "template_bot"
 BOTS_DIR = "bots"
 CONFIG_FILENAME = "config.json"
 WORKFLOW_TEMPLATE_PATH = os.path.join(".github", "workflows", "template_workflow.yml")
+SHARDED_WORKFLOW_TEMPLATE_PATH = os.path.join(".github", "workflows", "template_workflow_sharded.yml")
 WORKFLOW_DIR = os.path.join(".github", "workflows")
-README_LOG_ENTRY_TEMPLATE = "- Bot '%%BOT_NAME%%' created on %%DATE%%. AWS Profile: %%AWS_PROFILE%%, Users: %%USERS%%, Schedule: %%CRON_SCHEDULE%%\n"
+README_LOG_ENTRY_TEMPLATE = "- Bot '%%BOT_NAME%%' created on %%DATE%%. AWS Profile: %%AWS_PROFILE%%, Users: %%USERS%%, Shards: %%SHARDS%%, Schedule: %%CRON_SCHEDULE%%\n"
 TEMPLATE_CRON_PLACEHOLDER = '0 0 1 1 *' # This is the placeholder in template_workflow.yml
 
+def parse_fields(fields_input):
+    # "title=name,price=offer.price" -> {"title": "name", "price": "offer.price", "fetched": None}
+    fields = {}
+    for pair in fields_input.split(","):
+        column, _, path = pair.partition("=")
+        column = column.strip()
+        if column:
+            fields[column] = path.strip() or column
+    # The fetch date is filled in by the bot on every run
+    fields.setdefault("fetched", None)
+    return fields
+
 def create_bot():
     print("Welcome to the Botanica Bot Creator!")
 
@@ -34,6 +47,23 @@ def create_bot():
     users_input = input("Enter a comma-separated list of users or entities for this bot (e.g., 'user1,user2'): ").strip()
     users_list = [user.strip() for user in users_input.split(',') if user.strip()] if users_input else []
 
+    # --- Get Shard Count ---
+    # Users are hash-partitioned into shards that run as parallel workflow jobs (see utils/shards.py)
+    shards = 1
+    if users_list:
+        while True:
+            shards_input = input("Enter the number of shards to split the users across, one workflow job each (default is 1, no sharding): ").strip()
+            if not shards_input:
+                break
+            if shards_input.isdigit() and int(shards_input) >= 1:
+                shards = int(shards_input)
+                break
+            print("The number of shards must be a whole number of at least 1.")
+
+    # --- Get Output Fields ---
+    fields_input = input("Enter the output columns as column=path pairs, where path is a dotted path into each scraped item (e.g., 'title=name,price=offer.price'; leave blank to keep the template's example fields): ").strip()
+    fields_spec = parse_fields(fields_input) if fields_input else None
+
     # --- Get Cron Schedule for GitHub Actions ---
     default_cron = "0 8 * * *"  # Default: 8 AM UTC daily
     cron_schedule = input(f"Enter the cron schedule for GitHub Actions (e.g., '0 8 * * *', default is '{default_cron}' for daily at 8 AM UTC): ").strip()
@@ -73,11 +103,43 @@ def create_bot():
     config_data["bot_name"] = bot_name
     config_data["s3_profile"] = aws_profile_name if aws_profile_name != "default (or environment variables)" else ""
     config_data["users"] = users_list
+    config_data["shards"] = shards
     # Add or update other default fields if necessary
     config_data.setdefault("output_directory", f"./src/data/{bot_name}")
     config_data.setdefault("archive_url", f"https://stilesdata.com/{bot_name}/{bot_name}.json") # Example, adjust as needed
     config_data.setdefault("timeseries_file", f"./src/data/{bot_name}_timeseries.json")
+    config_data.setdefault("timeseries_keys", [])
+    config_data.setdefault("timeseries_partition_column", None)
     config_data.setdefault("retry_attempts", 3)
+    config_data.setdefault("timeout", 30)
+    config_data.setdefault("startup_budget_ms", 300)
+    config_data.setdefault("s3_compression", "gzip")
+    # Off by default: an unchanged run would skip that day's timeseries rows
+    config_data.setdefault("skip_unchanged", False)
+    config_data.setdefault("record_metrics", True)
+    config_data.setdefault("cache_ttl", 3600)
+    config_data.setdefault("cache_max_mb", 100)
+    # Declarative record builder (see utils/records.py): each column maps to a path in a scraped item
+    if fields_spec:
+        config_data["fields"] = fields_spec
+        config_data["timeseries_columns"] = list(fields_spec)
+        # A timeseries row is identified by its fetch date and the first column entered
+        first_column = next((column for column in fields_spec if column != "fetched"), None)
+        config_data["timeseries_keys"] = ["fetched"] + ([first_column] if first_column else [])
+        config_data["timeseries_categories"] = [first_column] if first_column else []
+    config_data.setdefault("records_path", "items")
+    config_data.setdefault("fields", {"name": "name", "fetched": None})
+    config_data.setdefault("timeseries_columns", list(config_data["fields"]))
+    if users_list:
+        # One request per user; each row records its user, which also orders the rows when shards are merged
+        if "{user}" not in config_data.get("api_url", ""):
+            config_data["api_url"] = config_data.get("api_url", "https://api.example.com/data").rstrip("/") + "/{user}"
+        config_data["fields"] = {"user": None, **config_data["fields"]}
+        if "user" not in config_data["timeseries_columns"]:
+            config_data["timeseries_columns"] = ["user"] + config_data["timeseries_columns"]
+        config_data["shard_key"] = "user"
+        if config_data.get("timeseries_keys") and "user" not in config_data["timeseries_keys"]:
+            config_data["timeseries_keys"] = ["user"] + config_data["timeseries_keys"]
 
     try:
         with open(config_path, 'w') as f:
@@ -87,14 +149,19 @@ def create_bot():
         print(f"Error writing to '{config_path}': {e}")
 
     # --- Create GitHub Actions Workflow File ---
-    if not os.path.exists(WORKFLOW_TEMPLATE_PATH):
-        print(f"Error: GitHub Actions workflow template not found at '{WORKFLOW_TEMPLATE_PATH}'. Skipping workflow creation.")
+    # A sharded bot runs one matrix job per shard, then a job that merges their partial outputs
+    workflow_template_path = SHARDED_WORKFLOW_TEMPLATE_PATH if shards > 1 else WORKFLOW_TEMPLATE_PATH
+    if not os.path.exists(workflow_template_path):
+        print(f"Error: GitHub Actions workflow template not found at '{workflow_template_path}'. Skipping workflow creation.")
     else:
         try:
-            with open(WORKFLOW_TEMPLATE_PATH, 'r') as f_template:
+            with open(workflow_template_path, 'r') as f_template:
                 workflow_content = f_template.read()
             
             workflow_content = workflow_content.replace("%%BOT_NAME%%", bot_name)
+            # The commit step adds the directory the bot writes to, relative to the repository root
+            workflow_content = workflow_content.replace("%%DATA_PATH%%", os.path.join(config_data["output_directory"], ""))
+            workflow_content = workflow_content.replace("%%SHARD_LIST%%", json.dumps(list(range(shards))))
             # Replace the specific cron placeholder string with the desired cron schedule
             workflow_content = workflow_content.replace(TEMPLATE_CRON_PLACEHOLDER, cron_schedule)
 
@@ -117,6 +184,7 @@ def create_bot():
         log_entry = log_entry.replace("%%DATE%%", datetime.now().strftime("%Y-%m-%d"))
         log_entry = log_entry.replace("%%AWS_PROFILE%%", aws_profile_name)
         log_entry = log_entry.replace("%%USERS%%", ", ".join(users_list) if users_list else "N/A")
+        log_entry = log_entry.replace("%%SHARDS%%", str(shards))
         log_entry = log_entry.replace("%%CRON_SCHEDULE%%", cron_schedule)
         
         # This part assumes a specific structure in README.md, e.g., a line like "<!-- BOT_LOG_START -->"
@@ -131,7 +199,8 @@ def create_bot():
     print("Next steps:")
     print(f"1. Customize the scraping logic in '{os.path.join(new_bot_path, 'main.py')}'.")
     print(f"2. Add any bot-specific dependencies to '{os.path.join(new_bot_path, 'requirements.txt')}' and run 'pip install -r {os.path.join(new_bot_path, 'requirements.txt')}'.")
-    print(f"3. Test your bot locally: python {os.path.join(new_bot_path, 'main.py')}")
+    print(f"3. Test your bot locally: python {os.path.join(new_bot_path, 'main.py')}"
+          + (" --sharded" if shards > 1 else ""))
     print(f"4. Commit the new bot files and the workflow file ('{os.path.join(WORKFLOW_DIR, new_workflow_filename) if 'new_workflow_filename' in locals() else 'workflow file'}') to your repository.")
     print("5. Ensure GitHub Actions secrets (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION) are set in your repository settings.")
 
@@ -4,4 +4,9 @@ setup(
     name='botanica',
     version='0.1',
     packages=find_packages(),
+    entry_points={
+        'console_scripts': [
+            'botanica=utils.runner:main',
+        ],
+    },
 )
\ No newline at end of file
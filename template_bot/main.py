@@ -1,95 +1,158 @@
 import sys
 import os
-import json
-import requests
-import pytz
-import pandas as pd
-from bs4 import BeautifulSoup
-from datetime import datetime
-from utils.s3_upload import upload_to_s3
-
-# Add the project root directory to Python's path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
-
-# Load configuration settings
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if not os.path.exists(config_path):
-        print(f"Error: Config file not found at {config_path}")
-        exit(1)
-    with open(config_path, "r") as config_file:
-        return json.load(config_file)
 
-config = load_config()
+# Add the project root directory to Python's path before importing from utils
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-# Time settings
-pacific = pytz.timezone('America/Los_Angeles')
-now = datetime.now(pacific)
-TODAY = pd.Timestamp(now).strftime("%Y-%m-%d")
+from utils.bot import Bot, Unchanged
+from utils.s3_upload import upload_bot_outputs
+from utils.http import client_from_config
+from utils.fetch import fetch_all, DEFAULT_MAX_WORKERS
+from utils.output import write_bot_outputs
+from utils.script_json import extract_script_json
+from utils.timeseries import append_timeseries
+from utils.metrics import file_bytes, timed
+from utils.records import build_frames, records_at
+
+def parse_items(response):
+    # Runs in a fetch worker for per-user pages; raises so the error is reported against the user
+    response.raise_for_status()
+    return response
+
+class TemplateBot(Bot):
+    # A run is split into fetch (network), transform (parse, build frames), write and upload, so the
+    # pipeline runner can overlap them with other bots' stages and the users can be sharded; run() chains them
+    def fetch(self, context):
+        # Load config variables; context.today and context.now are fixed for the whole run
+        config = context.config
+        output_dir = config.get("output_directory")
+        archive_file = config.get("archive_file")
+
+        # Fetch data (example); the shared client handles timeouts, retries and conditional requests
+        # Each stage's wall time, bytes and rows go to .<bot>_metrics.jsonl (see utils/metrics.py)
+        client = client_from_config(config, output_dir)
+        url = config.get("api_url")
+        params = config.get("query_parameters", {})
+        if "{user}" in url:
+            # One page per user (only this shard's users in a sharded run), fetched concurrently
+            users = self.entities(context)
+            with context.metrics.stage("fetch") as fetch:
+                results = fetch_all(
+                    [url.format(user=user) for user in users],
+                    parse=parse_items,
+                    max_workers=config.get("max_workers", DEFAULT_MAX_WORKERS),
+                    rate_limit=config.get("rate_limit_per_host"),
+                    session=client,
+                    params=params,
+                )
+                fetch.add(bytes=client.bytes_received)
+            pages = []
+            for user, result in zip(users, results):
+                if result.error:
+                    print(f"Error fetching data for {user}: {result.error}")
+                    continue
+                pages.append((user, result.data))
+            return client, pages
+
+        # With "skip_unchanged", a 304 Not Modified stops the run; leave it off if every run must add timeseries rows
+        conditional = config.get("skip_unchanged", False) and os.path.exists(archive_file)
+        with context.metrics.stage("fetch") as fetch:
+            response = client.get(url, params=params, conditional=conditional)
+            fetch.add(bytes=client.bytes_received)
+        if response.not_modified:
+            raise Unchanged(f"{url} not modified since the last run")
+        response.raise_for_status()
+        return client, [(None, response)]
+
+    def process(self, context, fetched):
+        client, pages = fetched
+        outputs = super().process(context, pages)
+        # Remember the responses' validators, saved once their outputs are uploaded
+        self.after_upload(context, client.save_state)
+        return outputs
+
+    def transform(self, context, pages):
+        config = context.config
+
+        # Assuming JSON data is in a specific tag, e.g., <script> or directly in JSON
+        # --- CUSTOM SCRAPING LOGIC STARTS HERE ---
+        # The items live at "records_path" in each payload; adapt it to the data structure
+        with context.metrics.stage("parse") as parse:
+            items = []
+            item_users = []
+            for user, response in pages:
+                try:
+                    json_data = extract_script_json(response.text, '__NEXT_DATA__')
+                except ValueError:
+                    json_data = {}
+                page_items = records_at(json_data, config) if json_data else []
+                items += page_items
+                item_users += [user] * len(page_items)
+            parse.add(rows=len(items))
+
+        # "fields" in config.json maps each output column to a path in an item, with optional
+        # type, transform and default; null fields ("user", "fetched") are filled here. See utils/records.py
+        with context.metrics.stage("transform") as transform:
+            df, timeseries_df = build_frames(items, config, {'user': item_users, 'fetched': context.today})
+            transform.add(rows=len(df))
+        # --- CUSTOM SCRAPING LOGIC ENDS HERE ---
+        return {"archive": df, "timeseries": timeseries_df}
+
+    def write(self, context, frames):
+        # The frames of a whole run, or of every shard combined by --merge
+        config = context.config
+        output_dir = config.get("output_directory")
+        archive_file = config.get("archive_file")
+        timeseries_file = config.get("timeseries_file")
+        df, timeseries_df = frames["archive"], frames["timeseries"]
+
+        # Fingerprint the scraped content (not fetch times) to stop early when nothing changed
+        fingerprint = self.check_changed(context, output_dir, df)
+
+        with context.metrics.stage("write") as write:
+            # Ensure output directory exists
+            os.makedirs(output_dir, exist_ok=True)
+
+            # Save primary data to archive file
+            written = write_bot_outputs(df, archive_file, config)
+            write.add(bytes=file_bytes(written), rows=len(df))
+
+            # Update and save the timeseries
+            update_timeseries(timeseries_df, timeseries_file, config.get("timeseries_keys"),
+                              config.get("timeseries_partition_column"))
+
+        # Remember the fingerprint only once the outputs are written
+        self.record_fingerprint(context, output_dir, fingerprint)
+        return output_dir
+
+    def upload(self, context, output_dir):
+        # Upload the output directory to S3
+        with context.metrics.stage("upload") as upload:
+            upload.add(files=len(upload_bot_outputs(output_dir, context.config) or []))
+
+    def timeseries_file(self, config):
+        # The template reads the path from config.json, which --export-timeseries rebuilds
+        return config.get("timeseries_file")
+
+@timed("timeseries")
+def update_timeseries(timeseries_data, timeseries_file, key_columns=None, partition_column=None):
+    # Nothing to append if no new data is present
+    if len(timeseries_data) == 0:
+        return
+
+    import pandas as pd
+
+    new_data = pd.DataFrame(timeseries_data)
+    new_data['fetched'] = new_data['fetched'].astype(str)
+
+    # Append to the timeseries store; duplicates on the key columns resolve to the latest row
+    append_timeseries(new_data, timeseries_file, key_columns or ['fetched', 'name'], partition_column)
+
+bot = TemplateBot(os.path.dirname(os.path.abspath(__file__)))
 
 def run_scraper():
-    # Load config variables
-    output_dir = config.get("output_directory")
-    bot_slug = config.get("bot_name")
-    s3_profile = config.get("s3_profile")
-    archive_file = config.get("archive_file")
-    timeseries_file = config.get("timeseries_file")
-
-    # Initialize data lists
-    data = []
-    timeseries_data = []
-
-    # Fetch data (example)
-    url = config.get("api_url")
-    response = requests.get(url, params=config.get("query_parameters", {}))
-    content = BeautifulSoup(response.text, 'html.parser')
-    # Assuming JSON data is in a specific tag, e.g., <script> or directly in JSON
-    script_tag = content.find('script', id='__NEXT_DATA__')
-    json_data = json.loads(script_tag.text) if script_tag else {}
-
-    # Example parsing logic
-    items = json_data.get('items', [])  # Adapt based on data structure
-    for item in items:
-        # Example data parsing structure
-        item_data = {
-            'name': item.get('name', 'N/A'),
-            'description': item.get('description', ''),
-            'count': item.get('count', 0),
-            'fetched': TODAY
-        }
-        data.append(item_data)
-        timeseries_data.append(item_data)
-
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Save primary data to archive file
-    pd.DataFrame(data).to_json(archive_file, orient='records', indent=4)
-
-    # Update and save the timeseries
-    update_timeseries(timeseries_data, timeseries_file)
-
-    # Upload the output directory to S3
-    upload_to_s3(output_dir, bot_slug, s3_profile)
-
-def update_timeseries(timeseries_data, timeseries_file):
-    # Load existing timeseries data if available
-    if os.path.exists(timeseries_file):
-        ts_df = pd.read_json(timeseries_file)
-    else:
-        ts_df = pd.DataFrame(columns=['name', 'description', 'count', 'fetched'])
-
-    # Concatenate new and existing data only if new data is present
-    if timeseries_data:
-        new_data = pd.DataFrame(timeseries_data)
-        updated_ts_df = pd.concat([ts_df, new_data], ignore_index=True)
-        updated_ts_df.drop_duplicates(subset=['fetched', 'name'], keep='last', inplace=True)
-        updated_ts_df['fetched'] = updated_ts_df['fetched'].astype(str)
-    else:
-        updated_ts_df = ts_df
-
-    # Save updated timeseries
-    updated_ts_df.to_json(timeseries_file, orient='records', indent=4)
+    # Kept for callers that use the module-level entry point
+    bot.run(bot.context())
 
 if __name__ == "__main__":
-    run_scraper()
+    bot.main()
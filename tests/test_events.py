@@ -0,0 +1,13 @@
+from utils.events import EventLog
+
+def test_state_before_a_months_first_event_uses_the_previous_month(tmp_path):
+    events_file = str(tmp_path / "la_outages_events.json")
+    event_log = EventLog(events_file, "id", ["affected"])
+    event_log.record([{"id": 1, "affected": 10}, {"id": 2, "affected": 5}], "2024-10-31 23:55:00")
+    event_log.record([{"id": 1, "affected": 12}, {"id": 2, "affected": 5}], "2024-11-01 00:05:00")
+
+    # A fresh log replays the partitions instead of using the state kept by record()
+    replayed = EventLog(events_file, "id", ["affected"])
+    assert {key: record["affected"] for key, record in replayed.state("2024-11-01 00:01:00").items()} == {1: 10, 2: 5}
+    assert {key: record["affected"] for key, record in replayed.state("2024-11-01 00:05:00").items()} == {1: 12, 2: 5}
+    assert replayed.state("2024-10-31 23:00:00") == {}
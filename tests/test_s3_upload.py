@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from utils.s3_upload import MANIFEST_FILENAME, _collect_files, prepare_upload, upload_to_s3
+
+BUCKET = "bucket"
+
+@pytest.fixture
+def s3(monkeypatch):
+    # A moto-backed client with an empty bucket
+    moto = pytest.importorskip("moto")
+    import boto3
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def make_partitions(directory):
+    # Monthly partitions of two stores, with the same month names under each
+    for store in ("la_outages_timeseries", "la_outages_events"):
+        for year, month in (("2024", "11"), ("2024", "12"), ("2025", "11")):
+            write(os.path.join(directory, store, year, f"{month}.jsonl"), f'{{"store": "{store}/{year}/{month}"}}\n')
+    write(os.path.join(directory, "la_outages.json"), "[]")
+    write(os.path.join(directory, ".fingerprint.json"), "{}")
+    write(os.path.join(directory, "la_outages_timeseries", ".11.jsonl.idx"), "")
+
+def upload(directory, s3, **kwargs):
+    return upload_to_s3(directory, "la_outages", client=s3, bucket_name=BUCKET, **kwargs)
+
+def test_nested_files_keep_their_paths(tmp_path):
+    make_partitions(str(tmp_path))
+    keys = [key for _, key in _collect_files(str(tmp_path), "la_outages")]
+    assert len(keys) == len(set(keys)) == 7
+    assert "la_outages/la_outages.json" in keys
+    assert "la_outages/la_outages_timeseries/2024/11.jsonl" in keys
+    assert "la_outages/la_outages_events/2024/11.jsonl" in keys
+    assert "la_outages/la_outages_events/2025/11.jsonl" in keys
+    assert not any(os.path.basename(key).startswith(".") for key in keys)
+
+def test_nested_uploads_are_synced_once(tmp_path, s3):
+    make_partitions(str(tmp_path))
+    assert len(upload(str(tmp_path), s3)) == 7
+    body = s3.get_object(Bucket=BUCKET, Key="la_outages/la_outages_events/2024/12.jsonl")["Body"].read()
+    assert body == b'{"store": "la_outages_events/2024/12"}\n'
+    assert os.path.exists(os.path.join(str(tmp_path), MANIFEST_FILENAME))
+
+    # Nothing changed, so the manifest skips every file
+    assert upload(str(tmp_path), s3) == []
+
+def test_missing_manifest_skips_files_that_match_the_remote(tmp_path, s3):
+    make_partitions(str(tmp_path))
+    policies = {"*": "public, max-age=300"}
+    upload(str(tmp_path), s3, compression="gzip", cache_control=policies)
+    os.remove(os.path.join(str(tmp_path), MANIFEST_FILENAME))
+
+    # The remote ETags and headers match, so nothing goes up again and the manifest is rebuilt
+    assert upload(str(tmp_path), s3, compression="gzip", cache_control=policies) == []
+    assert os.path.exists(os.path.join(str(tmp_path), MANIFEST_FILENAME))
+
+def test_missing_manifest_uploads_files_whose_remote_headers_differ(tmp_path, s3):
+    make_partitions(str(tmp_path))
+    upload(str(tmp_path), s3, cache_control={"*": "public, max-age=300"})
+    os.remove(os.path.join(str(tmp_path), MANIFEST_FILENAME))
+
+    # Same content, new Cache-Control: every object is uploaded again with the new header
+    assert len(upload(str(tmp_path), s3, cache_control={"*": "public, max-age=3600"})) == 7
+    head = s3.head_object(Bucket=BUCKET, Key="la_outages/la_outages_timeseries/2025/11.jsonl")
+    assert head["CacheControl"] == "public, max-age=3600"
+
+def test_cache_control_matches_the_relative_key(tmp_path):
+    make_partitions(str(tmp_path))
+    policies = {"*_timeseries/*": "public, max-age=86400", "*": "public, max-age=300"}
+    for local_path, key in _collect_files(str(tmp_path), "la_outages"):
+        _, extra_args = prepare_upload(local_path, cache_control=policies, relative_key=key.split("/", 1)[1])
+        expected = "public, max-age=86400" if key.startswith("la_outages/la_outages_timeseries/") else "public, max-age=300"
+        assert extra_args["CacheControl"] == expected, key
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from utils.bot import Bot, Unchanged
+from utils.shards import read_partials, select_shard, write_partials
+
+USERS = [f"user{index}" for index in range(40)]
+
+def test_every_entity_lands_in_exactly_one_shard():
+    shards = [select_shard(USERS, shard, 4) for shard in range(4)]
+    assert sorted(user for shard in shards for user in shard) == sorted(USERS)
+    # The same entities, in their original order, on every call
+    assert shards == [select_shard(USERS, shard, 4) for shard in range(4)]
+    assert all(shard == [user for user in USERS if user in shard] for shard in shards)
+
+def test_partials_are_merged_in_the_order_of_the_users(tmp_path):
+    directory = str(tmp_path)
+    for shard in range(3):
+        users = select_shard(USERS, shard, 3)
+        frame = pd.DataFrame({"username": users, "followers": [USERS.index(user) for user in users]})
+        write_partials(directory, {"archive": frame}, shard, 3, len(users))
+    merged = read_partials(directory, 3, "username", USERS)["archive"]
+    assert list(merged["username"]) == USERS
+    assert list(merged["followers"]) == list(range(len(USERS)))
+
+def test_missing_partials_stop_the_merge(tmp_path):
+    directory = str(tmp_path)
+    write_partials(directory, {"archive": pd.DataFrame({"username": ["a"]})}, 0, 3)
+    write_partials(directory, {"archive": pd.DataFrame({"username": ["b"]})}, 2, 3)
+    with pytest.raises(ValueError, match=r"shard\(s\) 1 of 3"):
+        read_partials(directory, 3)
+
+class UnchangedBot(Bot):
+    # Every shard's fetch comes back 304 Not Modified
+    def fetch(self, context):
+        raise Unchanged("not modified since the last run")
+
+    def write(self, context, frames):
+        raise AssertionError("nothing should be merged")
+
+def unchanged_bot(tmp_path):
+    return UnchangedBot(str(tmp_path), {"bot_name": "unchanged", "shards": 2, "users": USERS,
+                                        "record_metrics": False})
+
+def test_unchanged_shards_are_not_failures(tmp_path):
+    with pytest.raises(Unchanged):
+        unchanged_bot(tmp_path).run_sharded(processes=1)
+
+@pytest.mark.parametrize("arg", ["--shard=abc", "--sharded=x", "--sharded=-1"])
+def test_malformed_shard_options_exit_with_a_usage_error(tmp_path, arg):
+    with pytest.raises(SystemExit) as exit_info:
+        unchanged_bot(tmp_path).main([arg])
+    assert exit_info.value.code == 1
@@ -0,0 +1,92 @@
+import os
+
+import pandas as pd
+
+from utils.timeseries import INDEX_RECORD, _append_store, _index_file, append_timeseries, read_timeseries, store_path
+
+KEYS = ["date", "cookie"]
+
+def frame(*rows):
+    return pd.DataFrame([dict(zip(["date", "cookie", "calories"], row)) for row in rows])
+
+def index_spans(store):
+    with open(_index_file(store), "rb") as f:
+        f.readline()
+        return [(start, end) for _, _, start, end in INDEX_RECORD.iter_unpack(f.read())]
+
+def test_index_records_the_byte_range_of_each_appended_line(tmp_path):
+    store = str(tmp_path / "crumbl_menu_timeseries.jsonl")
+    assert _append_store(frame(("2024-11-01", "Chocolate Chip", 720), ("2024-11-01", "Sugar", 640)), store, KEYS) == 2
+    assert _append_store(frame(("2024-11-02", "Chocolate Chip", 720)), store, KEYS) == 1
+
+    with open(store, "rb") as f:
+        data = f.read()
+    lines = data.splitlines(keepends=True)
+    spans = index_spans(store)
+    assert len(spans) == len(lines) == 3
+    assert [data[start:end] for start, end in spans] == lines
+    assert spans[-1][1] == len(data)
+
+def test_a_changed_row_overwrites_its_key(tmp_path):
+    timeseries_file = str(tmp_path / "crumbl_menu_timeseries.json")
+    append_timeseries(frame(("2024-11-01", "Sugar", 640), ("2024-11-01", "Snickerdoodle", 700)), timeseries_file, KEYS)
+    assert append_timeseries(frame(("2024-11-01", "Sugar", 650)), timeseries_file, KEYS) == 1
+    # An unchanged row isn't appended again
+    assert append_timeseries(frame(("2024-11-01", "Sugar", 650)), timeseries_file, KEYS) == 0
+
+    ts_df = read_timeseries(timeseries_file, KEYS)
+    assert ts_df.to_dict("records") == [
+        {"date": "2024-11-01", "cookie": "Snickerdoodle", "calories": 700},
+        {"date": "2024-11-01", "cookie": "Sugar", "calories": 650},
+    ]
+
+def test_a_missing_or_stale_index_is_rebuilt(tmp_path):
+    timeseries_file = str(tmp_path / "crumbl_menu_timeseries.json")
+    store = store_path(timeseries_file)
+    append_timeseries(frame(("2024-11-01", "Sugar", 640)), timeseries_file, KEYS)
+
+    os.remove(_index_file(store))
+    assert read_timeseries(timeseries_file, KEYS)["calories"].tolist() == [640]
+    assert os.path.exists(_index_file(store))
+
+    # A line written behind the index's back leaves it ending short of the store
+    with open(store, "a") as f:
+        f.write('{"date":"2024-11-01","cookie":"Sugar","calories":660}\n')
+    assert read_timeseries(timeseries_file, KEYS)["calories"].tolist() == [660]
+    assert index_spans(store)[-1][1] == os.path.getsize(store)
+
+    # An index built for other key columns isn't trusted either
+    assert read_timeseries(timeseries_file, ["date"])["calories"].tolist() == [660]
+    assert append_timeseries(frame(("2024-11-01", "Sugar", 660)), timeseries_file, KEYS) == 0
+
+def test_a_legacy_file_is_migrated_into_monthly_partitions(tmp_path):
+    timeseries_file = str(tmp_path / "la_outages_timeseries.json")
+    legacy = [
+        {"id": 1, "fetched": "2024-10-31 23:55:00", "affected": 10},
+        {"id": 2, "fetched": "2024-11-01 00:05:00", "affected": 5},
+        {"id": 1, "fetched": "2024-11-01 00:05:00", "affected": 12},
+    ]
+    pd.DataFrame(legacy).to_json(timeseries_file, orient="records")
+
+    new_rows = pd.DataFrame([{"id": 2, "fetched": "2024-11-01 00:15:00", "affected": 0}])
+    assert append_timeseries(new_rows, timeseries_file, ["id", "fetched"], "fetched") == 1
+
+    # The legacy file and the single store are gone; each row sits in its month's partition
+    assert not os.path.exists(timeseries_file)
+    assert not os.path.exists(store_path(timeseries_file))
+    partitions = tmp_path / "la_outages_timeseries"
+    assert sorted(str(path.relative_to(partitions)) for path in partitions.rglob("*.jsonl")) == ["2024/10.jsonl", "2024/11.jsonl"]
+
+    ts_df = read_timeseries(timeseries_file, ["id", "fetched"], partition_column="fetched")
+    assert ts_df.to_dict("records") == legacy + new_rows.to_dict("records")
+    october = read_timeseries(timeseries_file, ["id", "fetched"], partition_column="fetched", end="2024-10-31")
+    assert october.to_dict("records") == legacy[:1]
+
+def test_rows_without_a_date_are_left_out_of_a_date_range(tmp_path):
+    timeseries_file = str(tmp_path / "la_outages_timeseries.json")
+    append_timeseries(pd.DataFrame([{"id": 1, "fetched": "2024-11-02 08:00:00"}]), timeseries_file, None, "fetched")
+    with open(tmp_path / "la_outages_timeseries" / "2024" / "11.jsonl", "a") as f:
+        f.write('{"id":2,"fetched":null}\n')
+
+    assert read_timeseries(timeseries_file, partition_column="fetched", start="2024-11-01")["id"].tolist() == [1]
+    assert read_timeseries(timeseries_file, partition_column="fetched")["id"].tolist() == [1, 2]
@@ -0,0 +1,92 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from utils.runner import load_bot
+from utils.timeseries import read_timeseries, store_path
+
+pytest.importorskip("pytest_benchmark")
+
+# Times crumbl_menu's update_timeseries against the size of the existing history.
+#
+# "legacy" is the original implementation: it reads the whole history, parses
+# every date three times, re-derives week/year for every row, dedupes the full
+# frame and rewrites it. "append" is the current one, which normalizes only the
+# new rows and appends them to the store. "read" loads the store with
+# categoricals, the cost a consumer pays to get the consolidated history.
+# Usage: python -m pytest tests/test_timeseries_benchmark.py (needs pytest-benchmark;
+# pass --benchmark-skip to leave these out of a plain test run)
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), "..", "bots", "crumbl_menu", "src", "data",
+                           "crumbl_menu_timeseries.json")
+KEYS = ["date", "cookie"]
+CATEGORIES = ["cookie", "status"]
+NEW_ROWS = 12
+SIZES = [1000, 10000]
+
+def legacy_update_timeseries(timeseries_data, timeseries_file):
+    ts_df = pd.read_json(timeseries_file)
+    ts_df["fetched"] = pd.to_datetime(ts_df["fetched"]).dt.strftime("%Y-%m-%d")
+    new_data = pd.DataFrame(timeseries_data)
+    updated_ts_df = pd.concat([ts_df, new_data], ignore_index=True)
+    updated_ts_df["date"] = pd.to_datetime(updated_ts_df["date"]).dt.strftime("%Y-%m-%d")
+    updated_ts_df["week"] = pd.to_datetime(updated_ts_df["date"]).dt.isocalendar().week
+    updated_ts_df["year"] = pd.to_datetime(updated_ts_df["date"]).dt.year
+    updated_ts_df.drop_duplicates(subset=['date', 'cookie'], keep='last', inplace=True)
+    updated_ts_df['fetched'] = updated_ts_df['fetched'].astype(str)
+    updated_ts_df['week'] = updated_ts_df['week'].astype(str)
+    updated_ts_df['year'] = updated_ts_df['year'].astype(str)
+    updated_ts_df.to_json(timeseries_file, indent=4, orient='records')
+
+def synthetic_history(rows):
+    # Repeat the real history, shifting dates so every row stays a distinct (date, cookie) pair
+    sample = pd.read_json(SAMPLE_FILE, convert_dates=False, dtype=False)
+    sample = sample[["status", "cookie", "description", "image", "calories_serving",
+                     "calories_total", "date", "fetched"]]
+    copies = -(-rows // len(sample))
+    history = pd.concat([sample] * copies, ignore_index=True).head(rows)
+    offsets = pd.to_timedelta((history.index // len(sample)) * 7, unit="D")
+    history["date"] = (pd.to_datetime(history["date"]) - offsets).dt.strftime("%Y-%m-%d")
+    history["fetched"] = history["date"]
+    return history.drop_duplicates(subset=KEYS, keep="last")
+
+def new_rows():
+    sample = pd.read_json(SAMPLE_FILE, convert_dates=False, dtype=False)
+    sample = sample.drop_duplicates(subset=["cookie"], keep="last").tail(NEW_ROWS)
+    rows = sample[["status", "cookie", "description", "image", "calories_serving", "calories_total"]]
+    return [dict(row, date="2099-01-05", fetched="2099-01-05") for row in rows.to_dict("records")]
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"size={size}")
+def history(request, tmp_path):
+    # (legacy file, file backed by the store, history rows); the store is migrated and indexed up front,
+    # so the append timing covers a steady-state run
+    legacy_file = str(tmp_path / "legacy_timeseries.json")
+    current_file = str(tmp_path / "current_timeseries.json")
+    rows = synthetic_history(request.param)
+    rows.to_json(legacy_file, orient="records", indent=4)
+    shutil.copy(legacy_file, current_file)
+    read_timeseries(current_file, KEYS)
+    return legacy_file, current_file, len(rows)
+
+@pytest.mark.benchmark(group="timeseries update")
+def test_legacy_update(benchmark, history):
+    legacy_file, _, size = history
+    benchmark(legacy_update_timeseries, new_rows(), legacy_file)
+    assert len(pd.read_json(legacy_file)) == size + NEW_ROWS
+
+@pytest.mark.benchmark(group="timeseries update")
+def test_append_update(benchmark, history):
+    _, current_file, size = history
+    benchmark(load_bot("crumbl_menu").update_timeseries, new_rows(), current_file, KEYS)
+    assert os.path.exists(store_path(current_file))
+    assert len(read_timeseries(current_file, KEYS)) == size + NEW_ROWS
+
+@pytest.mark.benchmark(group="timeseries read")
+def test_categorical_read(benchmark, history):
+    _, current_file, size = history
+    load_bot("crumbl_menu").update_timeseries(new_rows(), current_file, KEYS)
+    consolidated = benchmark(read_timeseries, current_file, KEYS, CATEGORIES)
+    assert len(consolidated) == size + NEW_ROWS
+    assert all(consolidated[column].dtype == "category" for column in CATEGORIES)
@@ -0,0 +1,130 @@
+from urllib.parse import urlencode
+from utils.fetch import fetch_all, DEFAULT_MAX_WORKERS
+from utils.http import HttpClient
+
+# Query client for ArcGIS FeatureServer layers.
+#
+# A FeatureServer query returns at most the layer's maxRecordCount features and
+# flags the response with exceededTransferLimit when there are more. FeatureLayer
+# makes one ordinary query first, which is all a quiet day needs. When that
+# response is truncated it fetches the rest concurrently, either as pages
+# (resultOffset/resultRecordCount, when the layer supports pagination) or by
+# asking for every object ID (returnIdsOnly) and fetching the features in ID
+# batches.
+
+DEFAULT_OBJECT_ID_FIELD = "OBJECTID"
+STRATEGIES = ("auto", "pages", "ids")
+
+class ArcGISError(Exception):
+    pass
+
+def _parse(response):
+    # Runs in a fetch worker. ArcGIS reports query errors as HTTP 200 with an "error" object
+    response.raise_for_status()
+    payload = response.json()
+    if "error" in payload:
+        error = payload["error"]
+        raise ArcGISError(f"{error.get('code')}: {error.get('message')} {error.get('details') or ''}".strip())
+    return payload
+
+class FeatureLayer:
+    def __init__(self, query_url, client=None, max_workers=DEFAULT_MAX_WORKERS, rate_limit=None,
+                 strategy="auto"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown ArcGIS strategy '{strategy}'; expected one of {', '.join(STRATEGIES)}")
+        self.query_url = query_url
+        self.layer_url = query_url.rstrip("/").rsplit("/query", 1)[0]
+        self.client = client or HttpClient()
+        self.max_workers = max_workers
+        self.rate_limit = rate_limit
+        self.strategy = strategy
+        self._info = None
+
+    def _get(self, url, params):
+        return _parse(self.client.get(url, params=params))
+
+    def _get_many(self, param_sets):
+        # Concurrent queries, results in the order given; any failed request fails the fetch
+        urls = [f"{self.query_url}?{urlencode(params)}" for params in param_sets]
+        results = fetch_all(urls, parse=_parse, max_workers=self.max_workers,
+                            rate_limit=self.rate_limit, session=self.client)
+        for result in results:
+            if result.error:
+                raise ArcGISError(f"Query failed for {result.url}: {result.error}")
+        return [result.data for result in results]
+
+    def info(self):
+        # Layer metadata: maxRecordCount, objectIdField, advancedQueryCapabilities, fields
+        if self._info is None:
+            self._info = self._get(self.layer_url, {"f": "json"})
+        return self._info
+
+    def object_id_field(self):
+        return self.info().get("objectIdField") or DEFAULT_OBJECT_ID_FIELD
+
+    def supports_pagination(self):
+        return bool(self.info().get("advancedQueryCapabilities", {}).get("supportsPagination"))
+
+    def count(self, params=None):
+        return self._get(self.query_url, {**(params or {}), "f": "json", "returnCountOnly": "true"})["count"]
+
+    def object_ids(self, params=None):
+        payload = self._get(self.query_url, {**(params or {}), "f": "json", "returnIdsOnly": "true"})
+        return sorted(payload.get("objectIds") or [])
+
+    def query_pages(self, params, page_size):
+        # Every page, ordered by object ID so they don't overlap, requested at once
+        id_field = self.object_id_field()
+        total = self.count(params)
+        param_sets = [
+            {**params, "orderByFields": id_field, "resultOffset": offset, "resultRecordCount": page_size}
+            for offset in range(0, total, page_size)
+        ]
+        pages = self._get_many(param_sets)
+        if any(page.get("exceededTransferLimit") and len(page.get("features", [])) < page_size for page in pages):
+            raise ArcGISError(f"Pages of {page_size} exceed the transfer limit of {self.layer_url}")
+        return [feature for page in pages for feature in page.get("features", [])]
+
+    def query_by_ids(self, params, batch_size, skip_ids=()):
+        # Every feature matching params, fetched in batches of object IDs
+        skip_ids = set(skip_ids)
+        ids = [object_id for object_id in self.object_ids(params) if object_id not in skip_ids]
+        batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        param_sets = [
+            {**params, "objectIds": ",".join(str(object_id) for object_id in batch)}
+            for batch in batches
+        ]
+        pages = self._get_many(param_sets)
+        return [feature for page in pages for feature in page.get("features", [])]
+
+    def query(self, params=None):
+        # All features matching params (a FeatureServer query's parameters, e.g. where/outFields)
+        params = {"where": "1=1", "f": "json", **(params or {})}
+        if self.strategy != "auto":
+            page_size = self.info().get("maxRecordCount") or 1000
+            if self.strategy == "pages":
+                return self._dedupe(self.query_pages(params, page_size))
+            return self._dedupe(self.query_by_ids(params, page_size))
+
+        first = self._get(self.query_url, params)
+        features = first.get("features", [])
+        if not first.get("exceededTransferLimit"):
+            return features
+
+        # Truncated at maxRecordCount: fetch everything concurrently, as ordered pages when
+        # the layer supports them and by object ID otherwise
+        page_size = len(features) or self.info().get("maxRecordCount") or 1000
+        print(f"{self.layer_url} returned {page_size} features and more are available; fetching the rest.")
+        if self.supports_pagination():
+            return self._dedupe(self.query_pages(params, page_size))
+        id_field = self.object_id_field()
+        seen = [feature["attributes"].get(id_field) for feature in features]
+        return self._dedupe(features + self.query_by_ids(params, page_size, skip_ids=seen))
+
+    def _dedupe(self, features):
+        # Features that moved between pages while the layer was updating appear twice
+        id_field = self.object_id_field()
+        unique = {}
+        for feature in features:
+            unique.setdefault(feature["attributes"].get(id_field), feature)
+        return list(unique.values())
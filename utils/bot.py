@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import pytz
+from datetime import datetime
+from utils.fingerprint import content_fingerprint, load_fingerprint, save_fingerprint
+from utils.metrics import RunMetrics, activate, metrics_path, append_metrics, save_profile
+from utils.http_cache import parse_cache_args, replaying
+from utils.shards import PARTIALS_DIRNAME, check_shard, select_shard, write_partials, read_partials, clear_partials
+
+# Base class for bots.
+#
+# A bot module defines a Bot subclass and creates one instance at import time.
+# The subclass splits a run into fetch(context) (network), process(context,
+# fetched) (parse, transform and write; returns what to upload) and
+# upload(context, outputs); run(context) chains them, and the pipeline runner
+# (utils/pipeline.py) overlaps them across bots. A bot can override run()
+# instead, and is then run as a single step. process() defaults to
+# transform(context, fetched), which returns named frames, then write(context,
+# frames). A bot built that way can be sharded (see utils/shards.py): its
+# "users" are split into config "shards" groups and run separately with
+# --shard=I, each writing partial outputs, and --merge writes the combined
+# result. --sharded does all of it locally in a process pool.
+#
+# Creating the instance has no side effects: config.json is read the first time
+# it is needed, and the current time comes from the bot's clock when a run
+# starts. A scheduler can therefore import a bot once and run it many times,
+# and tests can inject a fixed config or clock.
+#
+# A run that finds nothing new raises Unchanged. `python main.py` then exits with
+# UNCHANGED_EXIT_CODE, so a workflow can skip its commit and push steps.
+#
+# execute() runs once and appends the run's stage metrics (see utils/metrics.py)
+# to .<bot>_metrics.jsonl; `python main.py --profile` also dumps cProfile stats.
+# --cache and --offline serve HTTP responses from disk (see utils/http_cache.py).
+# --export-timeseries rebuilds and uploads the consolidated timeseries JSON
+# instead of running the bot.
+
+DEFAULT_TIMEZONE = 'America/Los_Angeles'
+CONFIG_FILENAME = 'config.json'
+UNCHANGED_EXIT_CODE = 78
+
+class ConfigError(Exception):
+    pass
+
+class Unchanged(Exception):
+    pass
+
+def load_config(bot_dir):
+    config_path = os.path.join(bot_dir, CONFIG_FILENAME)
+    if not os.path.exists(config_path):
+        raise ConfigError(f"Config file not found at {config_path}")
+    with open(config_path, "r") as config_file:
+        return json.load(config_file)
+
+class RunContext:
+    # Everything a single run needs, fixed when the run starts; shard is set for one shard of a sharded run,
+    # merge for the run that combines the shards' partial outputs
+    def __init__(self, bot, now, shard=None, merge=False):
+        self.bot = bot
+        self.config = bot.config
+        self.now = now
+        self.today = now.strftime("%Y-%m-%d")
+        self.metrics = RunMetrics(bot.name, now)
+        self.shard = shard
+        self.merge = merge
+        # (callback, args) saved by Bot.finish() once the outputs are uploaded
+        self.pending = []
+
+class Bot:
+    timezone = DEFAULT_TIMEZONE
+
+    def __init__(self, bot_dir, config=None, clock=None):
+        self.bot_dir = bot_dir
+        self._config = config
+        # clock() returns the current, timezone-aware datetime
+        self.clock = clock or self.default_clock
+
+    def default_clock(self):
+        return datetime.now(pytz.timezone(self.timezone))
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = load_config(self.bot_dir)
+        return self._config
+
+    def reload_config(self):
+        self._config = None
+
+    @property
+    def name(self):
+        return self.config.get("bot_name") or os.path.basename(self.bot_dir)
+
+    def context(self, shard=None, merge=False):
+        if shard is not None:
+            try:
+                check_shard(shard, self.shards)
+            except ValueError as e:
+                raise ConfigError(str(e))
+        return RunContext(self, self.clock(), shard, merge)
+
+    def run(self, context):
+        if context.merge:
+            outputs = self.write(context, self.merge_partials(context))
+            # Merged once; a later merge must not pick up this run's shards
+            clear_partials(self.partials_dir())
+        else:
+            outputs = self.process(context, self.fetch(context))
+        # None means there's nothing to upload, e.g. a shard's partial outputs
+        if outputs is not None:
+            self.upload(context, outputs)
+        self.finish(context)
+
+    def fetch(self, context):
+        raise NotImplementedError
+
+    def process(self, context, fetched):
+        frames = self.transform(context, fetched)
+        if context.shard is not None:
+            self.save_partials(context, frames)
+            return None
+        return self.write(context, frames)
+
+    def transform(self, context, fetched):
+        # {name: DataFrame}, e.g. {"archive": df, "timeseries": timeseries_df}
+        raise NotImplementedError
+
+    def write(self, context, frames):
+        # Writes the frames and returns what upload() should upload
+        raise NotImplementedError
+
+    def upload(self, context, outputs):
+        pass
+
+    @property
+    def staged(self):
+        # True when the bot is split into fetch/process/upload rather than a single run()
+        return type(self).fetch is not Bot.fetch
+
+    @property
+    def shardable(self):
+        return type(self).write is not Bot.write
+
+    @property
+    def shards(self):
+        return self.config.get("shards") or 1
+
+    def entities(self, context):
+        # The bot's "users", narrowed to this run's shard
+        users = context.config.get("users", [])
+        if context.shard is None:
+            return users
+        return select_shard(users, context.shard, self.shards)
+
+    def partials_dir(self):
+        return os.path.join(self.bot_dir, PARTIALS_DIRNAME)
+
+    def save_partials(self, context, frames):
+        entities = self.entities(context)
+        paths = write_partials(self.partials_dir(), frames, context.shard, self.shards, len(entities))
+        print(f"{self.name}: shard {context.shard} of {self.shards} ({len(entities)} entities) "
+              f"wrote partial outputs to {self.partials_dir()}")
+        return paths
+
+    def merge_partials(self, context):
+        with context.metrics.stage("merge") as merge:
+            try:
+                frames = read_partials(self.partials_dir(), self.shards, context.config.get("shard_key"),
+                                       context.config.get("users", []))
+            except ValueError as e:
+                raise ConfigError(str(e))
+            merge.add(rows=sum(len(frame) for frame in frames.values()))
+        return frames
+
+    def run_sharded(self, processes=None):
+        # Every shard in a pool of forked worker processes (one after another where fork isn't
+        # available), then the merge in this one
+        global _sharded_bot
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        clear_partials(self.partials_dir())
+        shards = list(range(self.shards))
+        # Forked workers inherit the bot, so it never has to be pickled
+        _sharded_bot = self
+        if "fork" in multiprocessing.get_all_start_methods():
+            with ProcessPoolExecutor(max_workers=processes or len(shards),
+                                     mp_context=multiprocessing.get_context("fork")) as executor:
+                statuses = list(executor.map(_run_shard, shards))
+        else:
+            statuses = [_run_shard(shard) for shard in shards]
+        failed = [str(shard) for shard, status in zip(shards, statuses) if status not in MERGEABLE_STATUSES]
+        if failed:
+            raise ConfigError(f"Shard(s) {', '.join(failed)} failed; not merging")
+        # An unchanged shard isn't a failure. When every shard is unchanged there's nothing to merge; otherwise
+        # the merge still needs each shard's partials and reports any that are missing
+        if all(status == "unchanged" for status in statuses):
+            raise Unchanged(f"All {len(shards)} shards unchanged since the last run")
+        self.execute(self.context(merge=True))
+
+    def check_changed(self, context, output_dir, payload):
+        # Returns the payload's fingerprint; with "skip_unchanged" set, raises Unchanged if it matches the last run.
+        # Replayed responses always run through, since the point is to iterate on what comes after the fetch
+        fingerprint = content_fingerprint(payload)
+        if (context.config.get("skip_unchanged", False) and not replaying()
+                and fingerprint == load_fingerprint(output_dir, self.name)):
+            raise Unchanged("Scraped content unchanged since the last run")
+        return fingerprint
+
+    def after_upload(self, context, callback, *args):
+        # State that marks the outputs as published (fingerprints, HTTP validators) is saved only once
+        # the upload succeeds, so a run whose write or upload failed is retried instead of skipped as unchanged
+        context.pending.append((callback, args))
+
+    def finish(self, context):
+        pending, context.pending = context.pending, []
+        for callback, args in pending:
+            callback(*args)
+
+    def record_fingerprint(self, context, output_dir, fingerprint):
+        # Call once the outputs are written; the fingerprint is saved after the upload
+        self.after_upload(context, save_fingerprint, output_dir, self.name, fingerprint)
+
+    def output_dir(self, config):
+        # Where the bot writes its outputs. Most bots take a relative output_directory from the working
+        # directory (the repository root in the workflows); a bot that resolves it differently overrides this
+        return config.get("output_directory") or "."
+
+    def timeseries_file(self, config):
+        # The path the timeseries store is derived from; a bot that keeps it elsewhere overrides this
+        return os.path.join(self.output_dir(config), f"{self.name}_timeseries.json")
+
+    def export_timeseries(self, upload=True):
+        # Rebuilds the consolidated <bot>_timeseries.json from the store and uploads it. It reads the whole
+        # history, so it runs on its own schedule (--export-timeseries), never as part of a run
+        from utils.timeseries import export_timeseries
+        from utils.s3_upload import upload_bot_outputs
+        config = self.config
+        written = export_timeseries(self.timeseries_file(config), config.get("timeseries_keys"), ["json"], config,
+                                    None, config.get("timeseries_partition_column"))
+        if upload:
+            for path in written:
+                upload_bot_outputs(path, config)
+        return written
+
+    def metrics_file(self):
+        # Next to the bot's outputs
+        return metrics_path(self.output_dir(self.config), self.name)
+
+    def execute(self, context=None, profile=None):
+        # One run with its metrics recorded; with profile (a path) the run is also profiled with cProfile
+        context = context or self.context()
+        profiler = None
+        if profile:
+            import cProfile
+            profiler = cProfile.Profile()
+        status = "failed"
+        try:
+            with activate(context.metrics):
+                if profiler:
+                    profiler.enable()
+                try:
+                    self.run(context)
+                finally:
+                    if profiler:
+                        profiler.disable()
+            status = "ok"
+        except Unchanged:
+            status = "unchanged"
+            raise
+        finally:
+            if profiler:
+                save_profile(profiler, profile)
+            self.record_metrics(context, status)
+
+    def record_metrics(self, context, status):
+        if not context.config.get("record_metrics", True):
+            return
+        record = context.metrics.to_record(status)
+        try:
+            append_metrics(self.metrics_file(), record)
+        except OSError as e:
+            print(f"Could not write metrics to {self.metrics_file()}: {e}")
+            return
+        print(f"{self.name}: {status} in {record['seconds']:.2f}s, peak RSS {record['peak_rss_mb']} MB")
+        context.metrics.print_summary()
+
+    def main(self, argv=None):
+        # Entry point for `python bots/<name>/main.py [--profile[=path]] [--cache | --offline] [--cache-dir=path]
+        # [--shard=I | --merge | --sharded[=processes] | --export-timeseries]`
+        argv = parse_cache_args(sys.argv[1:] if argv is None else argv)
+        profile = None
+        export = False
+        shard = None
+        merge = False
+        sharded = None
+        try:
+            for arg in argv:
+                if arg == "--profile":
+                    profile = f"{self.name}.prof"
+                elif arg.startswith("--profile="):
+                    profile = arg.split("=", 1)[1]
+                elif arg.startswith("--shard="):
+                    shard = _count_option(arg)
+                elif arg == "--merge":
+                    merge = True
+                elif arg == "--sharded":
+                    sharded = 0
+                elif arg.startswith("--sharded="):
+                    sharded = _count_option(arg)
+                elif arg == "--export-timeseries":
+                    export = True
+            if export:
+                self.export_timeseries()
+                return
+            if (shard is not None or merge or sharded is not None) and not self.shardable:
+                raise ConfigError(f"{self.name} can't be sharded: it doesn't split process() into transform() and write()")
+            if sharded is not None:
+                self.run_sharded(sharded or None)
+            else:
+                self.execute(self.context(shard, merge), profile=profile)
+        except Unchanged as e:
+            print(f"{self.name}: {e}; nothing to write or upload.")
+            sys.exit(UNCHANGED_EXIT_CODE)
+        except ConfigError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+def _count_option(arg):
+    # The number in --shard=I or --sharded=N; anything else is a usage error, not a traceback
+    option, value = arg.split("=", 1)
+    try:
+        number = int(value)
+    except ValueError:
+        raise ConfigError(f"{option} takes a whole number, not '{value}'")
+    if number < 0:
+        raise ConfigError(f"{option} can't be negative ({number})")
+    return number
+
+_sharded_bot = None
+
+# Statuses of shards whose run doesn't stop the merge
+MERGEABLE_STATUSES = ("ok", "unchanged")
+
+def _run_shard(shard):
+    # One shard of _sharded_bot in a worker process; returns its status
+    bot = _sharded_bot
+    try:
+        bot.execute(bot.context(shard))
+        return "ok"
+    except Unchanged as e:
+        print(f"{bot.name}: shard {shard}: {e}")
+        return "unchanged"
+    except Exception as e:
+        print(f"{bot.name}: shard {shard} failed: {type(e).__name__}: {e}")
+        return "failed"
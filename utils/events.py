@@ -0,0 +1,192 @@
+import os
+import json
+import argparse
+from utils.jsonl import append_records, iter_records
+from utils.timeseries import store_path, partition_path, partition_period, list_partitions
+
+# Lifecycle events instead of full snapshots.
+#
+# A bot that tracks a set of things which come and go (power outages, say)
+# can record what changed between runs instead of appending every active row on
+# every run. EventLog diffs each run's records against the previous state by
+# key and appends only "opened" (the full record), "changed" (the tracked fields
+# that differ) and "closed" (just the key) events. state(at) replays the events
+# to rebuild the set that was active at any time.
+#
+# Events are JSON Lines, partitioned by month like the timeseries stores
+# (<bot>_events/YYYY/MM.jsonl). Each partition starts with "snapshot" events
+# holding the full state at that point, so rebuilding the state at time T
+# replays only one month: T's, or the month before when T comes before the
+# first event of its own month.
+
+OPENED = "opened"
+CHANGED = "changed"
+CLOSED = "closed"
+SNAPSHOT = "snapshot"
+EVENT_COLUMN = "event"
+OPENED_COLUMN = "opened"
+
+def _normalize(record):
+    # Round-trip through JSON so new records compare equal to replayed ones
+    return json.loads(json.dumps(record, default=str))
+
+def apply_event(state, event, key, time_column="fetched"):
+    kind = event.get(EVENT_COLUMN)
+    object_id = event.get(key)
+    fields = {name: value for name, value in event.items() if name not in (EVENT_COLUMN, time_column)}
+    if kind == OPENED:
+        state[object_id] = {**fields, OPENED_COLUMN: event.get(time_column)}
+    elif kind == SNAPSHOT:
+        state[object_id] = fields
+    elif kind == CHANGED and object_id in state:
+        state[object_id].update(fields)
+    elif kind == CLOSED:
+        state.pop(object_id, None)
+    return state
+
+def diff_records(previous, current, key, fields, at, time_column="fetched"):
+    # Events that turn `previous` into `current`; both map key -> record
+    events = []
+    for object_id in sorted(current, key=str):
+        record = current[object_id]
+        before = previous.get(object_id)
+        if before is None:
+            events.append({EVENT_COLUMN: OPENED, time_column: at, **record})
+            continue
+        changes = {name: record.get(name) for name in fields if record.get(name) != before.get(name)}
+        if changes:
+            events.append({EVENT_COLUMN: CHANGED, time_column: at, key: object_id, **changes})
+    for object_id in sorted(previous.keys() - current.keys(), key=str):
+        events.append({EVENT_COLUMN: CLOSED, time_column: at, key: object_id})
+    return events
+
+class EventLog:
+    def __init__(self, events_file, key, fields, time_column="fetched", partitioned=True):
+        self.events_file = events_file
+        self.key = key
+        self.fields = list(fields)
+        self.time_column = time_column
+        self.partitioned = partitioned
+        # The latest state, kept after record() so consecutive runs don't replay the log
+        self._latest = None
+
+    def _path(self, at):
+        if self.partitioned:
+            return partition_path(self.events_file, partition_period(at))
+        return store_path(self.events_file)
+
+    def exists(self):
+        if self.partitioned:
+            return bool(list_partitions(self.events_file))
+        return os.path.exists(store_path(self.events_file))
+
+    def events(self, start=None, end=None):
+        # Every event, oldest first, optionally limited to a date range
+        if self.partitioned:
+            paths = [path for _, path in list_partitions(self.events_file, start, end)]
+        else:
+            paths = [store_path(self.events_file)]
+        return iter_records(paths, self.time_column, start, end)
+
+    def state(self, at=None):
+        # {key: record} active at `at` (a timestamp string as stored), or after the latest event
+        if at is None and self._latest is not None:
+            return {object_id: dict(record) for object_id, record in self._latest.items()}
+        if self.partitioned:
+            # Each month opens with a snapshot, so only one month is replayed: the latest whose first
+            # event is at or before T (T's month, or the one before when T precedes its first event)
+            paths = []
+            for _, path in reversed(list_partitions(self.events_file, end=at)):
+                first = self._first_event(path)
+                if first is not None and (at is None or str(first.get(self.time_column)) <= str(at)):
+                    paths = [path]
+                    break
+        else:
+            paths = [store_path(self.events_file)]
+
+        state = {}
+        for event in iter_records(paths):
+            if at is not None and str(event.get(self.time_column)) > str(at):
+                break
+            apply_event(state, event, self.key, self.time_column)
+        return state
+
+    def _first_event(self, path):
+        records = iter_records(path)
+        try:
+            return next(records, None)
+        finally:
+            records.close()
+
+    def snapshot(self, at=None):
+        # The state at `at` as a DataFrame, one row per active record
+        import pandas as pd
+        return pd.DataFrame(list(self.state(at).values()))
+
+    def record(self, records, at):
+        # Diff this run's records (dicts without the time column) against the last state and append the events
+        at = str(at)
+        current = {}
+        for record in records:
+            record = _normalize({name: value for name, value in record.items() if name != self.time_column})
+            current[record[self.key]] = record
+        previous = self.state()
+
+        events = []
+        path = self._path(at)
+        if self.partitioned and previous and not os.path.exists(path):
+            # First run of a new month: open the partition with the full state
+            events += [{EVENT_COLUMN: SNAPSHOT, self.time_column: at, **record} for record in previous.values()]
+        events += diff_records(previous, current, self.key, self.fields, at, self.time_column)
+        if events:
+            append_records(path, events)
+
+        latest = previous
+        for event in events:
+            apply_event(latest, event, self.key, self.time_column)
+        self._latest = latest
+        return events
+
+def rebuild_from_snapshots(event_log, records):
+    # Replay a snapshot history (rows ordered by time, one group per run) into the event log
+    runs = 0
+    batch = []
+    batch_time = None
+    for record in records:
+        at = record.get(event_log.time_column)
+        if batch and at != batch_time:
+            event_log.record(batch, batch_time)
+            runs += 1
+            batch = []
+        batch_time = at
+        batch.append(record)
+    if batch:
+        event_log.record(batch, batch_time)
+        runs += 1
+    return runs
+
+if __name__ == "__main__":
+    # Usage: python -m utils.events <events_file> --key id --fields affected status --from-timeseries <timeseries_file>
+    #        python -m utils.events <events_file> --key id --at "2024-12-01 12:00:00"
+    parser = argparse.ArgumentParser(description="Build or query a lifecycle event log")
+    parser.add_argument("events_file")
+    parser.add_argument("--key", required=True)
+    parser.add_argument("--fields", nargs="*", default=[])
+    parser.add_argument("--time-column", default="fetched")
+    parser.add_argument("--unpartitioned", action="store_true")
+    parser.add_argument("--from-timeseries", help="Snapshot timeseries to convert into events")
+    parser.add_argument("--timeseries-partition-column", default=None)
+    parser.add_argument("--at", help="Print the records active at this time")
+    args = parser.parse_args()
+
+    event_log = EventLog(args.events_file, args.key, args.fields, args.time_column, not args.unpartitioned)
+    if args.from_timeseries:
+        from utils.jsonl import iter_timeseries_records
+        history = iter_timeseries_records(args.from_timeseries, partition_column=args.timeseries_partition_column)
+        runs = rebuild_from_snapshots(event_log, history)
+        print(f"Recorded {runs} runs from {args.from_timeseries} as events in {args.events_file}")
+    if args.at or not args.from_timeseries:
+        active = event_log.snapshot(args.at)
+        print(f"{len(active)} active at {args.at or 'the latest event'}")
+        if not active.empty:
+            print(active.to_string(index=False, max_rows=50))
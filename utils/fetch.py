@@ -0,0 +1,61 @@
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from utils.http import pooled_session
+
+# Concurrent fetch layer for bots that request many pages per run.
+#
+# fetch_all() downloads a list of URLs through a thread pool that shares one
+# pooled requests.Session, throttles each host to a maximum request rate and
+# returns one FetchResult per URL in the same order the URLs were given. Errors
+# are captured per URL instead of aborting the whole run.
+
+DEFAULT_MAX_WORKERS = 8
+
+FetchResult = namedtuple("FetchResult", ["url", "data", "error", "elapsed"])
+
+class HostRateLimiter:
+    # Spaces out requests to the same host so at most `rate` start per second
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def fetch_all(urls, parse=None, max_workers=DEFAULT_MAX_WORKERS, rate_limit=None,
+              session=None, **request_kwargs):
+    # parse(response) runs in the worker; its return value becomes the result's data.
+    # session can be anything with a requests-style get(), e.g. utils.http.HttpClient
+    urls = list(urls)
+    max_workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, len(urls) or 1))
+    # Keep one connection per worker alive so requests to the same host reuse sockets
+    session = session or pooled_session(max_workers)
+    limiter = HostRateLimiter(rate_limit)
+
+    def fetch_one(url):
+        start = time.perf_counter()
+        try:
+            limiter.wait(url)
+            response = session.get(url, **request_kwargs)
+            data = parse(response) if parse else response
+            return FetchResult(url, data, None, time.perf_counter() - start)
+        except Exception as e:
+            return FetchResult(url, None, e, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map yields results in input order regardless of completion order
+        return list(executor.map(fetch_one, urls))
@@ -0,0 +1,51 @@
+import os
+import json
+import hashlib
+
+# Change detection for bot runs.
+#
+# A bot fingerprints the payload it scraped (before adding fetch times or other
+# per-run fields) and compares it with the fingerprint stored after its last
+# successful run. When they match, the run can stop before rewriting outputs,
+# uploading to S3 or committing. Fingerprints live in a hidden file in the
+# bot's output directory, which the workflows commit (DATA_PATH) or, for a bot
+# that doesn't commit, keep in the Actions cache; hidden files aren't uploaded.
+# Only turn this on for bots whose outputs don't gain rows on every run: a
+# timeseries keyed by the run's date would miss the days that didn't change.
+
+FINGERPRINT_FILENAME = ".fingerprint.json"
+
+def content_fingerprint(payload):
+    # Canonical JSON (sorted keys, no whitespace), so key order and formatting don't count as changes
+    if hasattr(payload, "columns") and hasattr(payload, "to_dict"):
+        # A DataFrame hashes like the list of records it was built from
+        payload = payload.to_dict(orient="records")
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _fingerprint_file(output_dir):
+    return os.path.join(output_dir, FINGERPRINT_FILENAME)
+
+def load_fingerprint(output_dir, bot_slug):
+    path = _fingerprint_file(output_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get(bot_slug)
+    except (OSError, ValueError):
+        return None
+
+def save_fingerprint(output_dir, bot_slug, fingerprint):
+    path = _fingerprint_file(output_dir)
+    fingerprints = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                fingerprints = json.load(f)
+        except (OSError, ValueError):
+            fingerprints = {}
+    fingerprints[bot_slug] = fingerprint
+    os.makedirs(output_dir, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(fingerprints, f, indent=4, sort_keys=True)
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.http_cache import CacheMiss, cache_for
+
+# Shared HTTP client for the bots.
+#
+# HttpClient wraps one pooled requests.Session and adds what every bot needs:
+# a timeout on every request, retries with exponential backoff and jitter
+# (config "retry_attempts"), and conditional GETs. With conditional=True the
+# client sends the ETag/Last-Modified validators it stored for that URL, and a
+# 304 response comes back with `not_modified` set so the bot can skip parsing
+# and writing entirely. Validators are kept in a small JSON state file. With a
+# ResponseCache (see utils/http_cache.py) fresh cached responses are returned
+# without a request, and successful ones are stored for the next run.
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+STATE_FILENAME = ".http_state.json"
+SHARED_POOL_SIZE = 32
+
+# Bots running in the same process share one connection pool (see shared_session)
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def pooled_session(pool_size=10):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def shared_session():
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = pooled_session(SHARED_POOL_SIZE)
+        return _shared_session
+
+class HttpClient:
+    def __init__(self, retry_attempts=DEFAULT_RETRY_ATTEMPTS, timeout=DEFAULT_TIMEOUT,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, state_file=None, pool_size=10, headers=None,
+                 session=None, cache=None):
+        self.retry_attempts = retry_attempts
+        self.timeout = timeout
+        self.backoff_factor = backoff_factor
+        self.state_file = state_file
+        self.validators = self._load_state()
+
+        # Default headers stay on the client so a shared session is never mutated
+        self.headers = dict(headers or {})
+        self.session = session or pooled_session(pool_size)
+        self.cache = cache
+
+        # Body bytes of the responses returned by get(), for the run metrics
+        self.bytes_received = 0
+        self._bytes_lock = threading.Lock()
+
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable HTTP state file {self.state_file}: {e}")
+            return {}
+
+    def save_state(self):
+        if not self.state_file:
+            return
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        with open(self.state_file, "w") as f:
+            json.dump(self.validators, f, indent=4, sort_keys=True)
+
+    def _backoff(self, attempt, response=None):
+        # Honor Retry-After when the server sends one, otherwise use full jitter
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = random.uniform(0, self.backoff_factor * (2 ** attempt))
+        time.sleep(min(delay, MAX_BACKOFF))
+
+    def get(self, url, params=None, headers=None, conditional=False, **kwargs):
+        key = requests.Request("GET", url, params=params).prepare().url
+        cache = self.cache if not kwargs.get("stream") else None
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                cached.not_modified = False
+                self._count_bytes(cached)
+                return cached
+            if cache.offline:
+                raise CacheMiss(f"{key} is not in the response cache ({cache.directory})")
+            # A 304 has no body to cache, so cached runs always ask for the full response
+            conditional = False
+
+        headers = {**self.headers, **(headers or {})}
+        if conditional:
+            stored = self.validators.get(key, {})
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retry_attempts + 1):
+            last_try = attempt == self.retry_attempts
+            try:
+                response = self.session.get(url, params=params, headers=headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last_try:
+                    raise
+                print(f"Request to {url} failed ({e}); retrying ({attempt + 1}/{self.retry_attempts})")
+                self._backoff(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last_try:
+                print(f"Request to {url} returned {response.status_code}; retrying ({attempt + 1}/{self.retry_attempts})")
+                self._backoff(attempt, response)
+                continue
+            break
+
+        response.not_modified = response.status_code == 304
+        if not kwargs.get("stream"):
+            self._count_bytes(response)
+        if conditional and response.ok and not response.not_modified:
+            self._remember(key, response)
+        if cache and response.status_code == 200:
+            cache.put(key, response)
+        return response
+
+    def _count_bytes(self, response):
+        with self._bytes_lock:
+            self.bytes_received += len(response.content)
+
+    def _remember(self, key, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.validators[key] = {"etag": etag, "last_modified": last_modified}
+        else:
+            self.validators.pop(key, None)
+
+def client_from_config(config, state_dir=None, **overrides):
+    # Build a client from a bot's config.json; validators live in state_dir,
+    # connections come from the process-wide shared session and responses go
+    # through the bot's response cache when it's switched on
+    options = {
+        "session": shared_session(),
+        "retry_attempts": config.get("retry_attempts", DEFAULT_RETRY_ATTEMPTS),
+        "timeout": config.get("timeout", DEFAULT_TIMEOUT),
+        "backoff_factor": config.get("backoff_factor", DEFAULT_BACKOFF_FACTOR),
+        "state_file": os.path.join(state_dir, STATE_FILENAME) if state_dir else None,
+        "cache": cache_for(config),
+    }
+    options.update(overrides)
+    return HttpClient(**options)
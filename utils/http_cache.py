@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# On-disk HTTP response cache for local development and re-runs.
+#
+# With the cache switched on (`python bots/<name>/main.py --cache`), every
+# successful GET that goes through utils.http.HttpClient is stored under
+# .cache/http/<bot>/ and served from there until it is older than the bot's
+# "cache_ttl" (seconds). Each bot's directory is kept under "cache_max_mb" by
+# evicting the least recently used entries. --offline replays the cache
+# regardless of age and never touches the network: a URL that isn't cached
+# raises CacheMiss. Entries are plain files, the body as received and a JSON
+# sidecar with the URL, status and headers, so a cache directory can be copied
+# and replayed as fixtures (--cache-dir). The cache is off unless configured,
+# so scheduled runs always fetch live data.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DIRECTORY = os.path.join(PROJECT_ROOT, ".cache", "http")
+DEFAULT_TTL = 3600
+DEFAULT_MAX_MB = 100
+# Describe the bytes on the wire, not the decoded body the cache stores
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+class CacheMiss(requests.exceptions.RequestException):
+    pass
+
+# Process-wide mode, set by Bot.main() or the runner before any client is built
+_settings = {"enabled": False, "offline": False, "directory": DEFAULT_DIRECTORY}
+
+def configure(enabled=True, offline=False, directory=None):
+    _settings["enabled"] = enabled or offline
+    _settings["offline"] = offline
+    _settings["directory"] = directory or DEFAULT_DIRECTORY
+
+def replaying():
+    # True when responses may come from the cache instead of the network
+    return _settings["enabled"]
+
+def cache_for(config):
+    # The bot's ResponseCache, or None when the cache is off
+    if not _settings["enabled"]:
+        return None
+    name = config.get("bot_name") or "default"
+    return ResponseCache(
+        os.path.join(_settings["directory"], name),
+        ttl=config.get("cache_ttl", DEFAULT_TTL),
+        max_bytes=int(config.get("cache_max_mb", DEFAULT_MAX_MB) * 1024 * 1024),
+        offline=_settings["offline"],
+    )
+
+def parse_cache_args(argv):
+    # Applies --cache, --offline and --cache-dir=<path>; returns the remaining arguments
+    remaining = []
+    enabled = offline = False
+    directory = None
+    for arg in argv:
+        if arg == "--cache":
+            enabled = True
+        elif arg == "--offline":
+            offline = True
+        elif arg.startswith("--cache-dir="):
+            directory = arg.split("=", 1)[1]
+            enabled = True
+        else:
+            remaining.append(arg)
+    if enabled or offline:
+        configure(enabled, offline, directory)
+    return remaining
+
+class ResponseCache:
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, key):
+        # Host in the name so a directory of fixtures stays readable
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        stem = os.path.join(self.directory, f"{urlparse(key).netloc.replace(':', '_') or 'local'}-{digest}")
+        return f"{stem}.json", f"{stem}.body"
+
+    def get(self, key):
+        # The cached response for key, or None if it's missing or (online) past its TTL
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if not self.offline and self.ttl is not None and time.time() - meta["stored_at"] > self.ttl:
+                self._count(hit=False)
+                return None
+            with open(body_path, "rb") as f:
+                body = f.read()
+            # The body's mtime is the entry's last use, for LRU eviction
+            os.utime(body_path)
+        except (OSError, ValueError, KeyError):
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return _to_response(meta, body)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, response):
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": key,
+            "status": response.status_code,
+            "reason": response.reason,
+            "encoding": response.encoding,
+            "headers": {name: value for name, value in response.headers.items()
+                        if name.lower() not in DROPPED_HEADERS},
+            "stored_at": time.time(),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # Body first and both via rename, so a reader never sees a sidecar without its body
+        _write_atomic(body_path, response.content)
+        _write_atomic(meta_path, json.dumps(meta, indent=4, sort_keys=True).encode("utf-8"))
+        self.evict()
+
+    def evict(self):
+        # Drop the least recently used entries until the directory fits in max_bytes
+        if not self.max_bytes:
+            return
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if not name.endswith(".body"):
+                    continue
+                body_path = os.path.join(self.directory, name)
+                meta_path = body_path[:-len(".body")] + ".json"
+                try:
+                    stat = os.stat(body_path)
+                    size = stat.st_size + (os.path.getsize(meta_path) if os.path.exists(meta_path) else 0)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, size, body_path, meta_path))
+                total += size
+            for _, size, body_path, meta_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for path in (meta_path, body_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+def _write_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _to_response(meta, body):
+    response = requests.Response()
+    response.status_code = meta["status"]
+    response.reason = meta.get("reason")
+    response.url = meta["url"]
+    response.encoding = meta.get("encoding")
+    response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    response._content = body
+    response.from_cache = True
+    return response
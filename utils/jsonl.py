@@ -0,0 +1,79 @@
+import os
+import json
+from utils.timeseries import store_path, list_partitions, migrate_timeseries
+
+# Streaming JSON Lines helpers.
+#
+# These read and write the timeseries stores one record at a time, without
+# pandas, so memory stays flat however long the history gets. Use them to
+# append a few rows, scan a date range or compute a small aggregate (latest row
+# per key, daily maximum) over a history that is too big, or too slow, to load
+# into a DataFrame.
+
+def append_records(path, records):
+    # Writes each record as one line as it arrives; returns the number written
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    count = 0
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":"), default=str))
+            f.write("\n")
+            count += 1
+    return count
+
+def _in_range(value, start, end):
+    # Dates compare as "YYYY-MM-DD" strings, so timestamps and plain dates mix
+    day = "" if value is None else str(value)[:10]
+    return (not start or day >= start) and (not end or day <= end)
+
+def iter_records(paths, date_column=None, start=None, end=None):
+    # Yields one dict per line from one or more JSON Lines files
+    if isinstance(paths, str):
+        paths = [paths]
+    start = str(start)[:10] if start else None
+    end = str(end)[:10] if end else None
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if date_column and (start or end) and not _in_range(record.get(date_column), start, end):
+                    continue
+                yield record
+
+def timeseries_paths(timeseries_file, partition_column=None, start=None, end=None):
+    # The store files behind a bot's timeseries, limited to start..end when partitioned
+    migrate_timeseries(timeseries_file, partition_column=partition_column)
+    if partition_column:
+        return [path for _, path in list_partitions(timeseries_file, start, end)]
+    return [store_path(timeseries_file)]
+
+def iter_timeseries_records(timeseries_file, date_column=None, start=None, end=None, partition_column=None):
+    # Every row of the store, including superseded ones; pair with latest_per_key() to dedupe
+    paths = timeseries_paths(timeseries_file, partition_column, start, end)
+    return iter_records(paths, date_column or partition_column, start, end)
+
+def _key(record, key_columns):
+    return tuple(record.get(column) for column in key_columns)
+
+def latest_per_key(records, key_columns):
+    # {key tuple: last record seen}; memory grows with the number of keys, not rows
+    latest = {}
+    for record in records:
+        latest[_key(record, key_columns)] = record
+    return latest
+
+def daily_max(records, date_column, value_column, group_columns=None):
+    # {(day, *group values): max value} in one pass, e.g. the most customers affected per day
+    maxima = {}
+    for record in records:
+        value = record.get(value_column)
+        if value is None:
+            continue
+        key = (str(record.get(date_column))[:10],) + _key(record, group_columns or [])
+        if key not in maxima or value > maxima[key]:
+            maxima[key] = value
+    return maxima
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from utils.jsonl import append_records
+
+# Per-stage run metrics.
+#
+# Every run gets a RunMetrics (context.metrics). Bots wrap their stages (fetch,
+# parse, transform, write, upload) in `with context.metrics.stage("fetch") as
+# stage:` and add counts as they go (stage.add(bytes=..., rows=...)). Each
+# stage records its wall time, how often it ran and the process's peak RSS when
+# it ended. Bot.execute() appends one record per run to .<bot>_metrics.jsonl in
+# the output directory, so a bot's history shows where its time goes and how
+# that changes. stage() and @timed() do the same for code that has no context
+# at hand: they report to the run in progress, and do nothing outside a run.
+
+METRICS_SUFFIX = "_metrics.jsonl"
+PROFILE_TOP = 30
+
+_current = contextvars.ContextVar("botanica_run_metrics", default=None)
+
+def peak_rss_mb():
+    # Peak resident memory of this process so far, or None where resource is unavailable (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def file_bytes(paths):
+    # Total size of the files that exist among paths
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.peak_rss_mb = None
+        self.counts = {}
+
+    def add(self, **counts):
+        # Accumulate counters such as bytes=, rows= or files=
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + (value or 0)
+
+    def to_dict(self):
+        return {"seconds": round(self.seconds, 4), "calls": self.calls,
+                "peak_rss_mb": self.peak_rss_mb, **self.counts}
+
+class RunMetrics:
+    def __init__(self, bot, started=None):
+        self.bot = bot
+        self.started = started
+        self.stages = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        # Times the block; a stage entered more than once accumulates
+        stage = self.stages.setdefault(name, Stage(name))
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds += time.perf_counter() - start
+            stage.calls += 1
+            stage.peak_rss_mb = peak_rss_mb()
+
+    def to_record(self, status):
+        return {
+            "bot": self.bot,
+            "started": str(self.started) if self.started is not None else None,
+            "status": status,
+            "seconds": round(time.perf_counter() - self._start, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+    def print_summary(self):
+        for name, stage in self.stages.items():
+            counts = ", ".join(f"{key}={value}" for key, value in stage.counts.items())
+            print(f"  {name:<12}{stage.seconds:>9.3f}s  {counts}")
+
+@contextmanager
+def activate(metrics):
+    # Makes metrics the target of stage() and @timed() for the duration of a run
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def stage(name):
+    # A stage of the run in progress; outside a run this yields a stage that isn't recorded
+    metrics = _current.get()
+    if metrics is None:
+        yield Stage(name)
+        return
+    with metrics.stage(name) as current:
+        yield current
+
+def timed(name):
+    # Decorator form of stage()
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def metrics_path(output_dir, bot_name):
+    # Hidden, so it is committed with the data but S3 sync leaves it out
+    return os.path.join(output_dir, f".{bot_name}{METRICS_SUFFIX}")
+
+def append_metrics(path, record):
+    append_records(path, [record])
+
+def save_profile(profiler, path, top=PROFILE_TOP):
+    # Dumps pstats data to path (open it with `python -m pstats`) and prints the top calls by cumulative time
+    import pstats
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    profiler.dump_stats(path)
+    print(f"Profile written to {path}")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
@@ -0,0 +1,57 @@
+import os
+
+# Pluggable output writer shared by the bots.
+#
+# Each bot lists the formats it publishes in config.json, e.g.
+#   "formats": ["json", "parquet", "csv"],
+#   "parquet_compression": "zstd"
+# and write_outputs() writes one file per format next to each other using the
+# same base name (crumbl_menu.json, crumbl_menu.parquet, crumbl_menu.csv).
+
+DEFAULT_FORMATS = ["json"]
+DEFAULT_PARQUET_COMPRESSION = "snappy"
+
+def _write_json(df, path, options):
+    # Compact records: no indentation, which is much faster to parse and smaller to upload
+    df.to_json(path, orient="records")
+
+def _write_parquet(df, path, options):
+    compression = options.get("parquet_compression", DEFAULT_PARQUET_COMPRESSION)
+    # Object columns with mixed values (e.g. numbers and NaN) are stored as strings
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    df.to_parquet(path, engine="fastparquet", compression=compression, index=False)
+
+def _write_csv(df, path, options):
+    df.to_csv(path, index=False)
+
+# Writers take (df, path, options) and are keyed by the file extension they produce
+WRITERS = {
+    "json": _write_json,
+    "parquet": _write_parquet,
+    "csv": _write_csv,
+}
+
+def output_formats(config):
+    return config.get("formats") or DEFAULT_FORMATS
+
+def write_outputs(df, base_path, formats=None, options=None):
+    # base_path may include an extension; it is replaced by each format's own
+    root, _ = os.path.splitext(base_path)
+    os.makedirs(os.path.dirname(root) or ".", exist_ok=True)
+    options = options or {}
+
+    written = []
+    for fmt in formats or DEFAULT_FORMATS:
+        writer = WRITERS.get(fmt)
+        if writer is None:
+            print(f"Skipping unknown output format '{fmt}'")
+            continue
+        path = f"{root}.{fmt}"
+        writer(df, path, options)
+        written.append(path)
+    return written
+
+def write_bot_outputs(df, base_path, config):
+    return write_outputs(df, base_path, output_formats(config), config)
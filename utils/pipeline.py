@@ -0,0 +1,167 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from utils.bot import Unchanged
+from utils.metrics import activate
+
+# Pipelined runs of many bots.
+#
+# run_pipeline() passes every bot through three stages: fetch (network),
+# process (parse, transform and write) and upload. Each stage has its own pool
+# of workers, and bounded queues connect the stages. While one bot is being
+# processed, the next ones are already fetching, and finished ones upload in
+# the background. When a queue is full, the stage feeding it waits
+# (backpressure), so fetched payloads can't pile up in memory faster than
+# they're processed. The stages are the bots' own blocking fetch(), process()
+# and upload() methods (see utils/bot.py), run in threads by an asyncio event
+# loop. A bot that only defines run() goes through as a single step in the
+# fetch stage. Every stage reports its utilization: the share of its workers'
+# time spent running bot code, rather than waiting for work or for room
+# downstream.
+
+STAGES = ("fetch", "process", "upload")
+DEFAULT_WORKERS = {"fetch": 4, "process": 1, "upload": 4}
+DEFAULT_QUEUE_SIZE = 2
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        # Seconds, summed over the stage's workers
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def utilization(self, wall):
+        return self.busy / (wall * self.workers) if wall else 0.0
+
+class Job:
+    # One bot on its way through the pipeline
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+        self.bot = getattr(module, "bot", None)
+        self.context = None
+        self.value = None
+        self.status = None
+        self.error = None
+        self.started = None
+        self.seconds = None
+
+    @property
+    def staged(self):
+        return self.bot is not None and getattr(self.bot, "staged", False)
+
+def _fetch(job):
+    # A bot's time is counted from the start of its fetch, so it includes its waits between stages
+    job.started = time.perf_counter()
+    if job.bot is None:
+        job.module.run_scraper()
+        return None
+    job.context = job.bot.context()
+    with activate(job.context.metrics):
+        return job.bot.fetch(job.context) if job.staged else job.bot.run(job.context)
+
+def _process(job):
+    with activate(job.context.metrics):
+        return job.bot.process(job.context, job.value)
+
+def _upload(job):
+    # None from process() means there's nothing to upload
+    if job.value is None:
+        return None
+    with activate(job.context.metrics):
+        return job.bot.upload(job.context, job.value)
+
+CALLS = {"fetch": _fetch, "process": _process, "upload": _upload}
+
+def _finish(job):
+    if job.status is None and job.bot is not None and job.context is not None:
+        # Every stage succeeded, so the state marking the outputs as published can be saved
+        try:
+            job.bot.finish(job.context)
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"Bot '{job.name}' failed saving its state: {job.error}")
+    job.status = job.status or "ok"
+    job.seconds = time.perf_counter() - job.started
+    if job.bot is not None and job.context is not None:
+        job.bot.record_metrics(job.context, job.status)
+
+async def _worker(stats, inbox, outbox, executor):
+    loop = asyncio.get_running_loop()
+    call = CALLS[stats.name]
+    while True:
+        waited = time.perf_counter()
+        job = await inbox.get()
+        stats.starved += time.perf_counter() - waited
+        if job is None:
+            return
+
+        started = time.perf_counter()
+        try:
+            job.value = await loop.run_in_executor(executor, call, job)
+        except Unchanged:
+            job.status = "unchanged"
+        except (Exception, SystemExit) as e:
+            # A failing bot (or one that calls exit()) must not take the others down
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"Bot '{job.name}' failed in {stats.name}: {job.error}")
+        stats.busy += time.perf_counter() - started
+        stats.items += 1
+
+        if job.status is None and outbox is not None and job.staged:
+            waited = time.perf_counter()
+            await outbox.put(job)
+            stats.blocked += time.perf_counter() - waited
+        else:
+            _finish(job)
+
+async def _run(jobs, workers, queue_size):
+    # The fetch queue holds every job up front; the queues after it are bounded
+    queues = [asyncio.Queue()] + [asyncio.Queue(maxsize=queue_size) for _ in STAGES[1:]]
+    for job in jobs:
+        queues[0].put_nowait(job)
+
+    stats = [StageStats(name, max(1, workers.get(name, DEFAULT_WORKERS[name]))) for name in STAGES]
+    # One thread per worker, so busy time never includes waiting for a thread
+    with ThreadPoolExecutor(max_workers=sum(stage.workers for stage in stats)) as executor:
+        tasks = []
+        for index, stage in enumerate(stats):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            tasks.append([asyncio.create_task(_worker(stage, queues[index], outbox, executor))
+                          for _ in range(stage.workers)])
+
+        # Close each stage once the one before it has drained
+        for index, stage in enumerate(stats):
+            for _ in range(stage.workers):
+                await queues[index].put(None)
+            await asyncio.gather(*tasks[index])
+    return stats
+
+def run_pipeline(names, load, workers=None, queue_size=DEFAULT_QUEUE_SIZE):
+    # Returns (one result per bot, in the order given; per-stage StageStats; wall seconds).
+    # load(name) returns the bot's module
+    start = time.perf_counter()
+    jobs = []
+    results = {}
+    for name in names:
+        try:
+            jobs.append(Job(name, load(name)))
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Bot '{name}' failed to load: {error}")
+            results[name] = {"bot": name, "status": "failed", "seconds": 0.0, "error": error}
+
+    stats = asyncio.run(_run(jobs, workers or {}, max(1, queue_size)))
+    for job in jobs:
+        results[job.name] = {"bot": job.name, "status": job.status, "seconds": job.seconds, "error": job.error}
+    return [results[name] for name in names], stats, time.perf_counter() - start
+
+def print_stage_summary(stats, wall):
+    print(f"\n{'stage':<10}{'workers':>8}{'items':>7}{'busy s':>9}{'idle s':>9}{'blocked s':>11}{'util':>7}")
+    for stage in stats:
+        print(f"{stage.name:<10}{stage.workers:>8}{stage.items:>7}{stage.busy:>9.2f}{stage.starved:>9.2f}"
+              f"{stage.blocked:>11.2f}{stage.utilization(wall):>7.0%}")
+    print(f"wall time {wall:.2f}s")
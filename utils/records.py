@@ -0,0 +1,136 @@
+import json
+
+# Declarative record builders.
+#
+# A bot's config.json can describe its output columns instead of building one
+# dict per item in Python:
+#
+#     "records_path": "props.pageProps.products.cookies",
+#     "fields": {
+#         "cookie": "name",
+#         "calories_total": "calorieInformation.total",
+#         "status": {"path": "status", "transform": "title"},
+#         "followers": {"path": "stats.followerCount", "type": "int", "default": 0},
+#         "fetched": null
+#     },
+#     "timeseries_columns": ["cookie", "status", "fetched"]
+#
+# Each field maps an output column to a dotted path into an item (digits index
+# lists), or to an object with the path plus an optional "type" (str, int,
+# float, bool, date, datetime), "transform" (title, upper, lower, strip) and
+# "default" for missing values. A null field is filled by the bot at run time
+# (fetch date, username, ...). build_frames() extracts every column in one pass
+# per column, applies casts and transforms to whole columns, and returns the
+# archive and timeseries frames as column selections of the same frame.
+
+TYPES = ("str", "int", "float", "bool", "date", "datetime")
+TRANSFORMS = ("title", "upper", "lower", "strip")
+
+def _path_keys(path):
+    return [int(key) if key.isdigit() else key for key in path.split(".")] if path else []
+
+def get_path(item, path):
+    # The value at a dotted path, or None if any step is missing
+    for key in _path_keys(path) if isinstance(path, str) else path:
+        try:
+            item = item[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return item
+
+def normalize_fields(fields):
+    # {column: {"path", "type", "transform", "default"}}; raises ValueError on an unknown type or transform
+    if isinstance(fields, str):
+        fields = json.loads(fields)
+    normalized = {}
+    for column, spec in (fields or {}).items():
+        if spec is None or isinstance(spec, str):
+            spec = {"path": spec}
+        spec = {"path": None, "type": None, "transform": None, "default": None, **spec}
+        if spec["type"] is not None and spec["type"] not in TYPES:
+            raise ValueError(f"Field '{column}': unknown type '{spec['type']}' (expected one of {', '.join(TYPES)})")
+        if spec["transform"] is not None and spec["transform"] not in TRANSFORMS:
+            raise ValueError(f"Field '{column}': unknown transform '{spec['transform']}' "
+                             f"(expected one of {', '.join(TRANSFORMS)})")
+        normalized[column] = spec
+    return normalized
+
+def _extract(items, path, default, levels):
+    # One level of the path at a time across all items, so each step is a single comprehension;
+    # levels caches the shared prefixes (e.g. "attributes") between columns
+    values = items
+    keys = _path_keys(path)
+    for depth, key in enumerate(keys, 1):
+        prefix = tuple(keys[:depth])
+        if prefix in levels:
+            values = levels[prefix]
+            continue
+        if isinstance(key, str):
+            try:
+                values = [value.get(key) for value in values]
+            except AttributeError:
+                # Some item is missing this level (None) or isn't an object
+                values = [value.get(key) if isinstance(value, dict) else None for value in values]
+        else:
+            values = [get_path(value, [key]) for value in values]
+        if depth < len(keys):
+            levels[prefix] = values
+    if default is not None:
+        values = [default if value is None else value for value in values]
+    return values
+
+def _cast(series, kind):
+    import pandas as pd
+    if kind in ("int", "float"):
+        numbers = pd.to_numeric(series, errors="coerce")
+        if kind == "float":
+            return numbers.astype(float)
+        return numbers.astype("Int64") if numbers.isna().any() else numbers.astype("int64")
+    if kind == "bool":
+        return series.astype(bool)
+    if kind == "date":
+        return pd.to_datetime(series, errors="coerce").dt.strftime("%Y-%m-%d")
+    return pd.to_datetime(series, errors="coerce")
+
+def build_frame(items, fields, values=None):
+    # One DataFrame with a column per field; values fills the null fields (a scalar or one value per item)
+    import pandas as pd
+    items = items if isinstance(items, list) else list(items)
+    values = values or {}
+    specs = normalize_fields(fields)
+    data = {}
+    levels = {}
+    for column, spec in specs.items():
+        if spec["path"] is None:
+            if column not in values:
+                raise KeyError(f"Field '{column}' has no path and no value was supplied")
+            value = values[column]
+            data[column] = list(value) if isinstance(value, (list, tuple)) else [value] * len(items)
+        else:
+            data[column] = _extract(items, spec["path"], spec["default"], levels)
+        if spec["type"] == "str":
+            # Before pandas infers a dtype, so integers with gaps don't come out as "1.0"
+            data[column] = [None if value is None else str(value) for value in data[column]]
+
+    frame = pd.DataFrame(data, columns=list(data))
+    for column, spec in specs.items():
+        if spec["type"] and spec["type"] != "str":
+            frame[column] = _cast(frame[column], spec["type"])
+        if spec["transform"] and not frame.empty:
+            frame[column] = getattr(frame[column].str, spec["transform"])()
+    return frame
+
+def build_frames(items, config, values=None):
+    # (archive, timeseries) frames from config's "fields", "archive_columns" and "timeseries_columns"
+    frame = build_frame(items, config.get("fields", {}), values)
+    archive_columns = config.get("archive_columns") or list(frame.columns)
+    timeseries_columns = config.get("timeseries_columns") or list(frame.columns)
+    return frame[archive_columns], frame[timeseries_columns]
+
+def records_at(payload, config):
+    # The item list at config's "records_path" (the payload itself when no path is set)
+    path = config.get("records_path")
+    items = get_path(payload, path) if path else payload
+    if items is None:
+        raise KeyError(f"No records at '{path}' in the payload")
+    return items
@@ -0,0 +1,119 @@
+import os
+import json
+from utils.output import write_outputs
+from utils.events import apply_event
+from utils.spatial import GridIndex, cell_bounds, h3_cells, DEFAULT_CELL_SIZE
+
+# Pre-aggregated rollups written next to a bot's outputs.
+#
+# Maps and charts usually need totals, not every point. write_rollups() turns
+# the current snapshot into small companion files: totals per group (e.g. per
+# city), per grid cell (JSON plus a GeoJSON of the cells), per H3 cell when h3
+# is installed, and per hour from the history. Consumers then download a few
+# kilobytes instead of re-binning the full point history themselves.
+
+DEFAULT_ROLLUP_HOURS = 168
+
+def rollup_by(df, columns, value_column):
+    # Number of rows and total/max value per group, largest total first
+    if df.empty:
+        return df.reindex(columns=list(columns) + ["count", "total", "max"])
+    grouped = df.groupby(list(columns), dropna=False)[value_column]
+    rollup = grouped.agg(count="count", total="sum", max="max").reset_index()
+    return rollup.sort_values("total", ascending=False, kind="stable").reset_index(drop=True)
+
+def grid_rollup(df, value_column, lon_column="longitude", lat_column="latitude", cell_size=DEFAULT_CELL_SIZE):
+    # rollup_by() over grid cells, with each cell's center for plotting
+    index = GridIndex(df[lon_column], df[lat_column], cell_size)
+    rollup = rollup_by(df.assign(cell=index.cell_ids()).dropna(subset=["cell"]), ["cell"], value_column)
+    bounds = [cell_bounds(cell, cell_size) for cell in rollup["cell"]]
+    rollup["longitude"] = [round((west + east) / 2, 6) for west, _, east, _ in bounds]
+    rollup["latitude"] = [round((south + north) / 2, 6) for _, south, _, north in bounds]
+    return rollup
+
+def grid_geojson(rollup, cell_size=DEFAULT_CELL_SIZE):
+    # The grid rollup as square polygons, ready for a choropleth
+    features = []
+    for record in rollup.to_dict("records"):
+        west, south, east, north = (round(value, 6) for value in cell_bounds(record["cell"], cell_size))
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [[
+                [west, south], [east, south], [east, north], [west, north], [west, south]
+            ]]},
+            "properties": {name: record[name] for name in ("cell", "count", "total", "max")},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+def hourly_rollup(runs):
+    # runs yields (time, row count, value total) per bot run in time order; returns
+    # the number of runs and the largest count and total seen in each hour
+    import pandas as pd
+    hours = {}
+    for at, count, total in runs:
+        hour = f"{str(at)[:13].replace(' ', 'T')}:00"
+        seen = hours.setdefault(hour, [0, 0, 0])
+        seen[0] += 1
+        seen[1] = max(seen[1], count)
+        seen[2] = max(seen[2], total)
+    return pd.DataFrame(
+        [{"hour": hour, "runs": runs_in_hour, "max_count": count, "max_total": total}
+         for hour, (runs_in_hour, count, total) in sorted(hours.items())],
+        columns=["hour", "runs", "max_count", "max_total"],
+    )
+
+def runs_from_events(event_log, value_column, start):
+    # (time, active count, value total) after each run recorded in an EventLog since `start`
+    state = event_log.state(start)
+    current = None
+    for event in event_log.events(start=start):
+        at = event.get(event_log.time_column)
+        if current is not None and at != current:
+            if str(current) >= str(start):
+                yield current, len(state), sum(record.get(value_column) or 0 for record in state.values())
+        current = at
+        # Replaying events from the start of `start`'s day again is harmless; every event is idempotent
+        apply_event(state, event, event_log.key, event_log.time_column)
+    if current is not None and str(current) >= str(start):
+        yield current, len(state), sum(record.get(value_column) or 0 for record in state.values())
+
+def runs_from_snapshots(records, value_column, time_column="fetched"):
+    # (time, row count, value total) per run from a snapshot timeseries
+    current, count, total = None, 0, 0
+    for record in records:
+        at = record.get(time_column)
+        if current is not None and at != current:
+            yield current, count, total
+            count, total = 0, 0
+        current = at
+        count += 1
+        total += record.get(value_column) or 0
+    if current is not None:
+        yield current, count, total
+
+def write_rollups(df, base_path, value_column, groups=None, cell_size=DEFAULT_CELL_SIZE,
+                  h3_resolution=None, runs=None):
+    # Companion files next to base_path (e.g. la_outages.json -> la_outages_by_cell.json); returns the paths.
+    # groups maps a file label to the column to group by, e.g. {"city": "name"}
+    root, _ = os.path.splitext(base_path)
+    written = []
+    for label, column in (groups or {}).items():
+        written += write_outputs(rollup_by(df, [column], value_column), f"{root}_by_{label}.json", ["json"])
+
+    grid = grid_rollup(df, value_column, cell_size=cell_size) if not df.empty else rollup_by(df, ["cell"], value_column)
+    written += write_outputs(grid, f"{root}_by_cell.json", ["json"])
+    with open(f"{root}_by_cell.geojson", "w") as f:
+        json.dump(grid_geojson(grid, cell_size), f, separators=(",", ":"))
+    written.append(f"{root}_by_cell.geojson")
+
+    if h3_resolution is not None and not df.empty:
+        cells = h3_cells(df["longitude"], df["latitude"], h3_resolution)
+        if cells is None:
+            print("h3 is not installed; skipping the H3 rollup")
+        else:
+            rollup = rollup_by(df.assign(h3=cells).dropna(subset=["h3"]), ["h3"], value_column)
+            written += write_outputs(rollup, f"{root}_by_h3.json", ["json"])
+
+    if runs is not None:
+        written += write_outputs(hourly_rollup(runs), f"{root}_by_hour.json", ["json"])
+    return written
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import argparse
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from utils.bot import Unchanged
+from utils import http_cache
+
+# Run several bots in one interpreter.
+#
+# `botanica run` (or `python -m utils.runner run`) discovers every bot under
+# bots/ and runs the selected ones, or all of them, in a single process. Pandas
+# and boto3 are imported once, and the HTTP session and S3 client are shared
+# between bots. With --processes N the bots run in a pool of worker processes
+# for isolation. The workers are forked after the heavy imports, so they still
+# share that cost. With --pipeline the bots' fetch, process and upload stages
+# overlap instead (see utils/pipeline.py). Each run ends with a per-bot timing
+# summary.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BOTS_DIR = os.path.join(PROJECT_ROOT, "bots")
+
+# Modules stay loaded, so running a bot again does not re-import it
+_loaded_bots = {}
+
+def discover_bots(bots_dir=BOTS_DIR):
+    if not os.path.isdir(bots_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(bots_dir)
+        if os.path.isfile(os.path.join(bots_dir, name, "main.py"))
+    )
+
+def load_bot(name, bots_dir=BOTS_DIR):
+    key = (bots_dir, name)
+    if key not in _loaded_bots:
+        path = os.path.join(bots_dir, name, "main.py")
+        spec = importlib.util.spec_from_file_location(f"botanica_bots.{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded_bots[key] = module
+    return _loaded_bots[key]
+
+def run_bot(name, bots_dir=BOTS_DIR, profile=False):
+    start = time.perf_counter()
+    try:
+        module = load_bot(name, bots_dir)
+        bot = getattr(module, "bot", None)
+        if bot is not None:
+            # Bot instances build a fresh context (config, clock) for every run and record its metrics
+            bot.execute(bot.context(), profile=f"{name}.prof" if profile else None)
+        else:
+            module.run_scraper()
+        status, error = "ok", None
+    except Unchanged:
+        status, error = "unchanged", None
+    except (Exception, SystemExit) as e:
+        # A failing bot (or one that calls exit()) must not take the others down
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        print(f"Bot '{name}' failed: {error}")
+    return {"bot": name, "status": status, "seconds": time.perf_counter() - start, "error": error}
+
+def _warm_imports():
+    # Import the heavy shared dependencies before forking so every worker inherits them
+    import pandas  # noqa: F401
+    import requests  # noqa: F401
+    import utils.s3_upload  # noqa: F401
+
+def _check_names(names, bots_dir):
+    names = list(names or discover_bots(bots_dir))
+    unknown = [name for name in names if name not in discover_bots(bots_dir)]
+    if unknown:
+        raise ValueError(f"Unknown bot(s): {', '.join(unknown)}")
+    return names
+
+def run_bots(names=None, bots_dir=BOTS_DIR, processes=0, profile=False):
+    names = _check_names(names, bots_dir)
+    _warm_imports()
+    if processes and processes > 0:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        context = multiprocessing.get_context(method)
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            return list(executor.map(run_bot, names, [bots_dir] * len(names), [profile] * len(names)))
+    return [run_bot(name, bots_dir, profile) for name in names]
+
+def run_pipelined(names=None, bots_dir=BOTS_DIR, workers=None, queue_size=None):
+    # Returns (results, per-stage stats, wall seconds)
+    from utils.pipeline import run_pipeline, DEFAULT_QUEUE_SIZE
+    names = _check_names(names, bots_dir)
+    _warm_imports()
+    return run_pipeline(names, lambda name: load_bot(name, bots_dir), workers, queue_size or DEFAULT_QUEUE_SIZE)
+
+def print_summary(results):
+    print(f"\n{'bot':<24}{'status':<10}{'seconds':>10}")
+    for result in results:
+        print(f"{result['bot']:<24}{result['status']:<10}{result['seconds']:>10.2f}")
+    print(f"{'total':<34}{sum(result['seconds'] for result in results):>10.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="botanica", description="Run Botanica bots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run selected bots, or all of them")
+    run_parser.add_argument("bots", nargs="*", help="Bot names (default: every bot under bots/)")
+    mode = run_parser.add_mutually_exclusive_group()
+    mode.add_argument("--processes", type=int, default=0,
+                      help="Run bots in a pool of N worker processes (default: in this process)")
+    mode.add_argument("--pipeline", action="store_true",
+                      help="Overlap the bots' fetch, process and upload stages")
+    run_parser.add_argument("--fetch-workers", type=int, help="Pipeline fetch workers (default: 4)")
+    run_parser.add_argument("--process-workers", type=int, help="Pipeline process workers (default: 1)")
+    run_parser.add_argument("--upload-workers", type=int, help="Pipeline upload workers (default: 4)")
+    run_parser.add_argument("--queue-size", type=int,
+                            help="Bots that may wait between two pipeline stages (default: 2)")
+    run_parser.add_argument("--profile", action="store_true",
+                            help="Profile each bot with cProfile and write <bot>.prof")
+    run_parser.add_argument("--cache", action="store_true",
+                            help="Serve HTTP responses from the on-disk cache while they're fresh")
+    run_parser.add_argument("--offline", action="store_true",
+                            help="Replay cached HTTP responses only; uncached URLs fail")
+    run_parser.add_argument("--cache-dir", help=f"Response cache directory (default: {http_cache.DEFAULT_DIRECTORY})")
+    run_parser.add_argument("--bots-dir", default=BOTS_DIR)
+
+    subparsers.add_parser("list", help="List the bots that can be run").add_argument("--bots-dir", default=BOTS_DIR)
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        print("\n".join(discover_bots(args.bots_dir)))
+        return 0
+
+    if args.cache or args.offline or args.cache_dir:
+        # Set before the pool forks, so worker processes inherit it
+        http_cache.configure(True, args.offline, args.cache_dir)
+    if args.pipeline:
+        if args.profile:
+            parser.error("--profile can't be combined with --pipeline")
+        workers = {stage: count for stage, count in (("fetch", args.fetch_workers), ("process", args.process_workers),
+                                                     ("upload", args.upload_workers)) if count}
+        results, stats, wall = run_pipelined(args.bots, args.bots_dir, workers, args.queue_size)
+        print_summary(results)
+        from utils.pipeline import print_stage_summary
+        print_stage_summary(stats, wall)
+    else:
+        results = run_bots(args.bots, args.bots_dir, args.processes, args.profile)
+        print_summary(results)
+    return 0 if all(result["status"] in ("ok", "unchanged") for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,244 @@
-import boto3
 import os
 import sys
 
-def upload_to_s3(path, bot_slug, profile_name=None):
+# When run as a script, this directory is first on sys.path and utils/http.py
+# would shadow the standard library's http package
+if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+    sys.path.pop(0)
+
+import io
+import gzip
+import json
+import hashlib
+import fnmatch
+import threading
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+# boto3 is imported on first use: it is the slowest import in a bot's startup
+# and only matters once there is something to upload
+
+BUCKET_NAME = 'stilesdata.com'
+MANIFEST_FILENAME = '.s3_manifest.json'
+DEFAULT_MAX_WORKERS = 8
+
+# Text formats worth pre-compressing; Parquet and images are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.json', '.jsonl', '.csv', '.geojson', '.txt', '.html'}
+CONTENT_TYPES = {
+    '.json': 'application/json',
+    '.geojson': 'application/geo+json',
+    '.jsonl': 'application/x-ndjson',
+    '.csv': 'text/csv',
+    '.parquet': 'application/vnd.apache.parquet',
+}
+
+class UploadError(Exception):
+    pass
+
+# One client per profile for the life of the process; boto3 clients are thread-safe
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_s3_client(profile_name=None):
     # If a profile_name is provided and running locally, use it
-    if profile_name and not os.getenv('GITHUB_ACTIONS'):
-        session = boto3.Session(profile_name=profile_name)
-    else:
+    if not profile_name or os.getenv('GITHUB_ACTIONS'):
         # Use default credentials set up via environment variables in GitHub Actions
-        session = boto3.Session()
-    
-    s3 = session.client('s3')
-    bucket_name = 'stilesdata.com'
+        profile_name = None
+
+    with _clients_lock:
+        if profile_name not in _clients:
+            import boto3
+            session = boto3.Session(profile_name=profile_name) if profile_name else boto3.Session()
+            _clients[profile_name] = session.client('s3')
+        return _clients[profile_name]
+
+def content_type(path):
+    extension = os.path.splitext(path)[1].lower()
+    return CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+def compress(data, encoding):
+    # Deterministic output (no gzip timestamp) so unchanged files hash the same every run
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        import cramjam
+        return bytes(cramjam.brotli.compress(data, level=11))
+    raise ValueError(f"Unsupported content encoding '{encoding}'")
+
+def cache_control_for(relative_key, policies):
+    # policies maps patterns to Cache-Control values; the first match wins. Patterns are matched against the
+    # key below the bot's folder, so "*_timeseries/*" picks out the partitions and "*" matches any file
+    for pattern, value in (policies or {}).items():
+        if fnmatch.fnmatch(relative_key, pattern):
+            return value
+    return None
+
+def prepare_upload(local_path, compression=None, cache_control=None, relative_key=None):
+    # Returns the bytes to upload and the ExtraArgs describing them; relative_key (the S3 key without the
+    # bot's folder) defaults to the file name
+    with open(local_path, 'rb') as f:
+        body = f.read()
+
+    extra_args = {'ContentType': content_type(local_path)}
+    extension = os.path.splitext(local_path)[1].lower()
+    if compression and extension in COMPRESSIBLE_EXTENSIONS:
+        body = compress(body, compression)
+        extra_args['ContentEncoding'] = compression
+    policy = cache_control_for(relative_key or os.path.basename(local_path), cache_control)
+    if policy:
+        extra_args['CacheControl'] = policy
+    return body, extra_args
+
+def _load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    # Check if the path is a directory or a single file
+def _save_manifest(manifest_path, manifest):
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+
+def upload_digest(body, extra_args):
+    # The content and the headers it's served with, so a change to either (e.g. a new
+    # s3_cache_control policy) uploads the file again
+    digest = hashlib.md5(body)
+    digest.update(json.dumps(extra_args, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def _remote_matches(s3, bucket_name, s3_path, body, extra_args):
+    # The ETag of a single-part upload is the MD5 of its content; the headers come back under the ExtraArgs names
+    from botocore.exceptions import ClientError
+    try:
+        head = s3.head_object(Bucket=bucket_name, Key=s3_path)
+    except ClientError:
+        return False
+    if head['ETag'].strip('"') != hashlib.md5(body).hexdigest():
+        return False
+    return all(head.get(name) == value for name, value in extra_args.items())
+
+def _collect_files(path, bot_slug):
+    # Returns [(local_path, s3_path)], skipping .DS_Store and other hidden files and directories.
+    # Keys keep the path below the directory, so partitions such as <bot>_timeseries/2024/11.jsonl don't collide
     if os.path.isdir(path):
-        # Upload all files within the directory
-        for root, _, files in os.walk(path):
-            for file in files:
-                # Skip .DS_Store files
-                if file == '.DS_Store':
+        collected = []
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for file in sorted(files):
+                if file.startswith('.'):
                     continue
-                
                 local_path = os.path.join(root, file)
-                s3_path = f"{bot_slug}/{file}"
-                s3.upload_file(local_path, bucket_name, s3_path)
-                print(f"Uploaded {file} to s3://{bucket_name}/{s3_path}")
-    elif os.path.isfile(path):
-        # Upload the single file
-        file_name = os.path.basename(path)
-        if file_name == '.DS_Store':
-            print("Skipping .DS_Store file.")
-            return  # Skip upload if it's .DS_Store
-        s3_path = f"{bot_slug}/{file_name}"
-        s3.upload_file(path, bucket_name, s3_path)
-        print(f"Uploaded {file_name} to s3://{bucket_name}/{s3_path}")
-    else:
+                relative = os.path.relpath(local_path, path).replace(os.sep, '/')
+                collected.append((local_path, f"{bot_slug}/{relative}"))
+        return collected
+    file_name = os.path.basename(path)
+    if file_name.startswith('.'):
+        print(f"Skipping hidden file {file_name}.")
+        return []
+    return [(path, f"{bot_slug}/{file_name}")]
+
+def upload_to_s3(path, bot_slug, profile_name=None, sync=True, max_workers=DEFAULT_MAX_WORKERS,
+                 client=None, bucket_name=BUCKET_NAME, compression=None, cache_control=None):
+    if not os.path.exists(path):
         print(f"Error: {path} is not a valid file or directory.")
+        return []
+
+    s3 = client or get_s3_client(profile_name)
+    files = _collect_files(path, bot_slug)
+
+    # The manifest records the hash of every file last uploaded from this directory, with its headers
+    manifest_dir = path if os.path.isdir(path) else os.path.dirname(path)
+    manifest_path = os.path.join(manifest_dir, MANIFEST_FILENAME)
+    manifest = _load_manifest(manifest_path) if sync else {}
+    manifest_lock = threading.Lock()
+
+    sizes = {'raw': 0, 'uploaded': 0}
+    failures = []
+
+    def upload_one(local_path, s3_path):
+        file_name = os.path.basename(local_path)
+        body, extra_args = prepare_upload(local_path, compression, cache_control, s3_path[len(bot_slug) + 1:])
+        # Hash what actually goes up, headers included
+        digest = upload_digest(body, extra_args)
+        with manifest_lock:
+            sizes['raw'] += os.path.getsize(local_path)
+            sizes['uploaded'] += len(body)
+        if sync:
+            known = manifest.get(s3_path)
+            if known == digest or (known is None and _remote_matches(s3, bucket_name, s3_path, body, extra_args)):
+                print(f"Skipped unchanged {file_name}")
+                with manifest_lock:
+                    manifest[s3_path] = digest
+                return None
+        try:
+            s3.upload_fileobj(io.BytesIO(body), bucket_name, s3_path, ExtraArgs=extra_args)
+        except Exception as e:
+            print(f"Error uploading {file_name} to s3://{bucket_name}/{s3_path}: {e}")
+            with manifest_lock:
+                failures.append(s3_path)
+            return None
+        with manifest_lock:
+            manifest[s3_path] = digest
+        encoding = f" ({extra_args['ContentEncoding']})" if 'ContentEncoding' in extra_args else ''
+        print(f"Uploaded {file_name}{encoding} to s3://{bucket_name}/{s3_path}")
+        return s3_path
+
+    workers = max(1, min(max_workers, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        uploaded = [key for key in executor.map(lambda item: upload_one(*item), files) if key]
+
+    if sync and files:
+        _save_manifest(manifest_path, manifest)
+    if compression and sizes['raw']:
+        _print_size_report(bot_slug, sizes['raw'], sizes['uploaded'])
+    # The other files are uploaded and recorded first; the run still fails, so the failed ones are retried
+    if failures:
+        raise UploadError(f"Failed to upload {len(failures)} of {len(files)} files to s3://{bucket_name}: "
+                          f"{', '.join(sorted(failures))}")
+    return uploaded
+
+def upload_bot_outputs(path, config, **kwargs):
+    # Upload using the bot's config.json settings
+    return upload_to_s3(
+        path,
+        config.get("bot_name"),
+        config.get("s3_profile"),
+        compression=config.get("s3_compression"),
+        cache_control=config.get("s3_cache_control"),
+        **kwargs,
+    )
+
+def _print_size_report(bot_slug, raw_bytes, compressed_bytes):
+    saved = raw_bytes - compressed_bytes
+    percent = 100 * saved / raw_bytes if raw_bytes else 0
+    print(f"{bot_slug}: {raw_bytes / 1024:.1f} KB raw, {compressed_bytes / 1024:.1f} KB compressed, "
+          f"{saved / 1024:.1f} KB saved ({percent:.0f}%)")
+
+def size_report(path, bot_slug, encodings=('gzip', 'br')):
+    # Bytes saved by each encoding for a bot's outputs, without uploading anything
+    files = _collect_files(path, bot_slug) if os.path.exists(path) else []
+    report = {}
+    for encoding in encodings:
+        raw_bytes = compressed_bytes = 0
+        for local_path, _ in files:
+            body, _ = prepare_upload(local_path, encoding)
+            raw_bytes += os.path.getsize(local_path)
+            compressed_bytes += len(body)
+        print(f"[{encoding}] ", end='')
+        _print_size_report(bot_slug, raw_bytes, compressed_bytes)
+        report[encoding] = (raw_bytes, compressed_bytes)
+    return report
 
 if __name__ == "__main__":
-    profile = sys.argv[3] if len(sys.argv) > 3 else None
-    upload_to_s3(sys.argv[1], sys.argv[2], profile)
\ No newline at end of file
+    # Usage: python utils/s3_upload.py <path> <bot_slug> [profile] [--force] [--gzip|--br] [--report]
+    flags = {arg for arg in sys.argv[1:] if arg.startswith('--')}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if '--report' in flags:
+        size_report(args[0], args[1])
+    else:
+        profile = args[2] if len(args) > 2 else None
+        compression = 'br' if '--br' in flags else 'gzip' if '--gzip' in flags else None
+        upload_to_s3(args[0], args[1], profile, sync='--force' not in flags, compression=compression)
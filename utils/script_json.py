@@ -0,0 +1,60 @@
+import re
+import json
+
+# Pull the JSON payload out of a <script id="..."> tag without building a full HTML tree.
+#
+# Pages like crumblcookies.com (__NEXT_DATA__) and TikTok profiles
+# (__UNIVERSAL_DATA_FOR_REHYDRATION__) ship all of their data in one script tag.
+# extract_script_json() finds that tag with a single regex scan and decodes its
+# contents; only if that fails does it fall back to parsing the page with
+# BeautifulSoup.
+
+_OPEN_TAG_TEMPLATE = r"""<script\b[^>]*?(?<![\w-])id\s*=\s*(["']?){id}\1(?=[\s/>])[^>]*>"""
+_open_tag_cache = {}
+
+def _open_tag_pattern(script_id):
+    pattern = _open_tag_cache.get(script_id)
+    if pattern is None:
+        pattern = re.compile(_OPEN_TAG_TEMPLATE.format(id=re.escape(script_id)), re.IGNORECASE)
+        _open_tag_cache[script_id] = pattern
+    return pattern
+
+def _decode(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Some pages wrap the object (e.g. "window.x = {...};"); keep the outermost braces
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end < start:
+            raise
+        return json.loads(text[start:end + 1])
+
+def find_script_text(html, script_id):
+    # Fast path: locate the opening tag, then the first closing tag after it
+    match = _open_tag_pattern(script_id).search(html)
+    if not match:
+        return None
+    end = html.find("</script", match.end())
+    if end == -1:
+        return None
+    return html[match.end():end]
+
+def _find_script_text_soup(html, script_id):
+    from bs4 import BeautifulSoup
+
+    script_tag = BeautifulSoup(html, "html.parser").find("script", id=script_id)
+    return script_tag.string if script_tag else None
+
+def extract_script_json(html, script_id):
+    text = find_script_text(html, script_id)
+    if text is not None:
+        try:
+            return _decode(text)
+        except ValueError:
+            pass
+
+    # Slow path: let BeautifulSoup deal with whatever markup confused the scan
+    text = _find_script_text_soup(html, script_id)
+    if not text:
+        raise ValueError(f"Could not find script tag with id '{script_id}'")
+    return _decode(text)
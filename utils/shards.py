@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+from utils.jsonl import iter_records
+
+# Sharded runs for bots that track many entities.
+#
+# A bot's "users" are hash-partitioned into config "shards" groups. Every entity
+# always lands in the same shard, on any machine or Python version. Each shard
+# is a separate run (`python main.py --shard=I`, one GitHub Actions matrix
+# job per shard). It fetches and transforms only its own entities, then writes
+# its frames as partial outputs: one JSON Lines file per frame and a manifest
+# that marks the shard complete. A final `python main.py --merge` reads every
+# shard's partials, combines them in the order of "users" (by the "shard_key"
+# column) and writes the archive and timeseries as an unsharded run would.
+
+PARTIALS_DIRNAME = "partials"
+
+def shard_of(entity, shards):
+    # Python's hash() is salted per process, so use a stable digest
+    digest = hashlib.md5(str(entity).encode("utf-8")).hexdigest()
+    return int(digest, 16) % shards
+
+def select_shard(entities, shard, shards):
+    return [entity for entity in entities if shard_of(entity, shards) == shard]
+
+def check_shard(shard, shards):
+    if shards < 1:
+        raise ValueError(f"shards must be at least 1, not {shards}")
+    if not 0 <= shard < shards:
+        raise ValueError(f"Shard {shard} is out of range for {shards} shards (0 to {shards - 1})")
+
+def _manifest_path(directory, shard, shards):
+    return os.path.join(directory, f"manifest.{shard}-of-{shards}.json")
+
+def _frame_path(directory, name, shard, shards):
+    return os.path.join(directory, f"{name}.{shard}-of-{shards}.jsonl")
+
+def write_partials(directory, frames, shard, shards, entities=None):
+    # frames is {name: DataFrame}; the manifest goes last, so a shard that dies halfway isn't merged
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"shard": shard, "shards": shards, "entities": entities, "frames": {}}
+    for name, frame in frames.items():
+        path = _frame_path(directory, name, shard, shards)
+        if frame.empty:
+            open(path, "w").close()
+        else:
+            frame.to_json(path, orient="records", lines=True, date_format="iso", double_precision=15)
+        manifest["frames"][name] = {"columns": list(frame.columns), "rows": len(frame)}
+    with open(_manifest_path(directory, shard, shards), "w") as f:
+        json.dump(manifest, f, indent=4)
+    return [_manifest_path(directory, shard, shards)] + [_frame_path(directory, name, shard, shards) for name in frames]
+
+def read_partials(directory, shards, order_column=None, order=None):
+    # {name: DataFrame} combined from every shard; raises ValueError if any shard's partials are missing
+    import pandas as pd
+    manifests = {}
+    for shard in range(shards):
+        path = _manifest_path(directory, shard, shards)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                manifests[shard] = json.load(f)
+    missing = [str(shard) for shard in range(shards) if shard not in manifests]
+    if missing:
+        raise ValueError(f"No partial outputs for shard(s) {', '.join(missing)} of {shards} in {directory}")
+
+    frames = {}
+    for name in manifests[0]["frames"]:
+        parts = [
+            pd.DataFrame(list(iter_records(_frame_path(directory, name, shard, shards))),
+                         columns=manifests[shard]["frames"][name]["columns"])
+            for shard in range(shards)
+        ]
+        frame = pd.concat([part for part in parts if not part.empty] or parts[:1], ignore_index=True)
+        if order and order_column in frame.columns:
+            # Back in the order of the entity list, as an unsharded run would have them
+            position = {entity: index for index, entity in enumerate(order)}
+            frame = (frame.assign(_order=frame[order_column].map(position))
+                     .sort_values("_order", kind="stable").drop(columns="_order").reset_index(drop=True))
+        frames[name] = frame
+    return frames
+
+def clear_partials(directory):
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("manifest.") or name.endswith(".jsonl"):
+            os.remove(os.path.join(directory, name))
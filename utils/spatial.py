@@ -0,0 +1,79 @@
+import math
+
+# Spatial indexing for point data (outages, stores, sightings).
+#
+# GridIndex bins points into square cells of `cell_size` degrees using plain
+# numpy, so it needs nothing beyond pandas' own dependencies. Cells give cheap
+# bounding-box queries and the grid rollups. When the optional geo stack from
+# requirements-geo.txt is installed, strtree() builds a shapely STRtree for
+# polygon queries, and h3_cells() labels points with H3 cells if the h3
+# package is present. Neither is imported unless used.
+
+DEFAULT_CELL_SIZE = 0.05  # degrees, about 5 km north-south
+
+def cell_id(column, row):
+    return f"{column}:{row}"
+
+def cell_bounds(cell, cell_size=DEFAULT_CELL_SIZE):
+    # (min_lon, min_lat, max_lon, max_lat) of a "column:row" cell id
+    column, row = (int(part) for part in cell.split(":"))
+    return (column * cell_size, row * cell_size, (column + 1) * cell_size, (row + 1) * cell_size)
+
+class GridIndex:
+    def __init__(self, longitudes, latitudes, cell_size=DEFAULT_CELL_SIZE):
+        import numpy as np
+        self.cell_size = cell_size
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        valid = ~(np.isnan(self.longitudes) | np.isnan(self.latitudes))
+        self.columns = np.full(len(self.longitudes), -1 << 31, dtype=np.int64)
+        self.rows = np.full(len(self.latitudes), -1 << 31, dtype=np.int64)
+        self.columns[valid] = np.floor(self.longitudes[valid] / cell_size).astype(np.int64)
+        self.rows[valid] = np.floor(self.latitudes[valid] / cell_size).astype(np.int64)
+        self.valid = valid
+
+        # cell id -> positions of the points in it
+        self.cells = {}
+        for position in np.flatnonzero(valid):
+            self.cells.setdefault(cell_id(self.columns[position], self.rows[position]), []).append(position)
+
+    def cell_ids(self):
+        # One cell id per point (None where the point has no coordinates)
+        return [cell_id(column, row) if valid else None
+                for column, row, valid in zip(self.columns, self.rows, self.valid)]
+
+    def query(self, min_lon, min_lat, max_lon, max_lat):
+        # Positions of the points inside the box, checking only the cells it overlaps
+        first_column, last_column = math.floor(min_lon / self.cell_size), math.floor(max_lon / self.cell_size)
+        first_row, last_row = math.floor(min_lat / self.cell_size), math.floor(max_lat / self.cell_size)
+        found = []
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for position in self.cells.get(cell_id(column, row), []):
+                    if (min_lon <= self.longitudes[position] <= max_lon
+                            and min_lat <= self.latitudes[position] <= max_lat):
+                        found.append(position)
+        return sorted(found)
+
+def strtree(longitudes, latitudes):
+    # A shapely STRtree over the points; requires requirements-geo.txt
+    try:
+        from shapely import STRtree, points
+    except ImportError as e:
+        raise ImportError("strtree() needs shapely: pip install -r requirements-geo.txt") from e
+    return STRtree(points(list(zip(longitudes, latitudes))))
+
+def h3_cells(longitudes, latitudes, resolution):
+    # H3 cell per point, or None when the h3 package isn't installed
+    try:
+        import h3
+    except ImportError:
+        return None
+    # h3 v4 renamed geo_to_h3 to latlng_to_cell
+    to_cell = getattr(h3, "latlng_to_cell", None) or h3.geo_to_h3
+    return [to_cell(lat, lon, resolution) if _has_value(lat) and _has_value(lon) else None
+            for lon, lat in zip(longitudes, latitudes)]
+
+def _has_value(value):
+    # False for None and NaN
+    return value is not None and value == value
@@ -0,0 +1,392 @@
+import os
+import io
+import re
+import json
+import shutil
+import struct
+import hashlib
+import argparse
+from utils.output import write_outputs
+
+# Append-only timeseries storage shared by the bots.
+#
+# Each bot keeps its history as JSON Lines next to the legacy timeseries file
+# (e.g. crumbl_menu_timeseries.json -> crumbl_menu_timeseries.jsonl). A run only
+# appends its new rows, so the cost of an update no longer grows with the size
+# of the history. Duplicates on the key columns are resolved when the store is
+# read (last row wins). The store replaces the legacy file: once its rows are
+# migrated, the legacy file is removed, so a stale copy is never committed or
+# uploaded. The consolidated JSON that consumers expect is rebuilt on demand
+# with export_timeseries(), off the per-run path (`python main.py
+# --export-timeseries`, run on a schedule for bots with "timeseries_export").
+#
+# When a bot has key columns, a hidden sidecar index (.<store>.idx) maps a hash
+# of each row's keys to the byte range of its latest line in the store. Appends
+# consult it to skip rows that are unchanged and record where the new ones
+# landed, so an upsert costs O(new rows). Reads use it to pick the live lines
+# directly instead of deduping the whole history. The index is append-only as
+# well; it is rebuilt from the store whenever it is missing, was built for other
+# key columns, or no longer ends where the store does.
+#
+# With a partition column (opt-in, "timeseries_partition_column" in config.json)
+# the history is split into one store per month instead,
+# <bot>_timeseries/YYYY/MM.jsonl, keyed on the first seven characters of that
+# column. A run then only changes the current month's file, which keeps the
+# commits of the data directory small, and a date range can be read without
+# opening the other months. Rows without a usable date go to undated.jsonl.
+# Keys are deduplicated within a partition, so the key columns should include
+# the partition column.
+
+INDEX_VERSION = 1
+# key digest, row digest, line start offset, line end offset
+INDEX_RECORD = struct.Struct("<8s8sQQ")
+PERIOD_PATTERN = re.compile(r"^\d{4}-\d{2}")
+UNDATED_PARTITION = "undated"
+
+def store_path(timeseries_file):
+    root, _ = os.path.splitext(timeseries_file)
+    return f"{root}.jsonl"
+
+def partition_dir(timeseries_file):
+    root, _ = os.path.splitext(timeseries_file)
+    return root
+
+def partition_path(timeseries_file, period, root=None):
+    # period is "YYYY-MM", or UNDATED_PARTITION
+    root = root or partition_dir(timeseries_file)
+    if period == UNDATED_PARTITION:
+        return os.path.join(root, f"{UNDATED_PARTITION}.jsonl")
+    year, month = period.split("-")
+    return os.path.join(root, year, f"{month}.jsonl")
+
+def partition_period(value):
+    text = "" if value is None else str(value)
+    return text[:7] if PERIOD_PATTERN.match(text) else UNDATED_PARTITION
+
+def list_partitions(timeseries_file, start=None, end=None):
+    # [(period, path)] in date order, limited to the months that overlap start..end
+    root = partition_dir(timeseries_file)
+    if not os.path.isdir(root):
+        return []
+    partitions = []
+    undated = partition_path(timeseries_file, UNDATED_PARTITION)
+    if not (start or end) and os.path.exists(undated):
+        partitions.append((UNDATED_PARTITION, undated))
+    for year in sorted(os.listdir(root)):
+        year_dir = os.path.join(root, year)
+        if not year.isdigit() or not os.path.isdir(year_dir):
+            continue
+        for name in sorted(os.listdir(year_dir)):
+            if not name.endswith(".jsonl") or name.startswith("."):
+                continue
+            period = f"{year}-{name[:-len('.jsonl')]}"
+            if (start and period < str(start)[:7]) or (end and period > str(end)[:7]):
+                continue
+            partitions.append((period, os.path.join(year_dir, name)))
+    return partitions
+
+def _retire_legacy(timeseries_file):
+    # A legacy file next to the store (e.g. restored by a fresh checkout of a bot that doesn't commit its data)
+    # is out of date; git history keeps the old file
+    if os.path.exists(timeseries_file):
+        os.remove(timeseries_file)
+        print(f"Removed {timeseries_file}; the history is kept in the timeseries store")
+
+def _migrate_legacy(timeseries_file, store):
+    # Seed the store once from an existing pretty-printed timeseries file, which it then replaces
+    if os.path.exists(store):
+        _retire_legacy(timeseries_file)
+        return
+    if not os.path.exists(timeseries_file):
+        return
+    import pandas as pd
+    legacy_df = pd.read_json(timeseries_file, convert_dates=False, dtype=False)
+    os.makedirs(os.path.dirname(store) or ".", exist_ok=True)
+    with open(store, "w") as f:
+        if not legacy_df.empty:
+            f.write(_to_lines(legacy_df))
+    print(f"Migrated {len(legacy_df)} rows from {timeseries_file} to {store}")
+    _retire_legacy(timeseries_file)
+
+def _migrate_partitions(timeseries_file, key_columns, partition_column):
+    # Split the single store (or the legacy file) into monthly partitions, once
+    if os.path.isdir(partition_dir(timeseries_file)):
+        _retire_legacy(timeseries_file)
+        return
+    store = store_path(timeseries_file)
+    _migrate_legacy(timeseries_file, store)
+    if not os.path.exists(store):
+        os.makedirs(partition_dir(timeseries_file), exist_ok=True)
+        return
+
+    # Build the partitions beside the final directory, so an interrupted split starts over
+    temp_root = f"{partition_dir(timeseries_file)}.tmp"
+    if os.path.isdir(temp_root):
+        shutil.rmtree(temp_root)
+    rows = 0
+    handles = {}
+    try:
+        with open(store, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                period = partition_period(json.loads(line).get(partition_column))
+                if period not in handles:
+                    path = partition_path(timeseries_file, period, temp_root)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    handles[period] = open(path, "ab")
+                handles[period].write(line if line.endswith(b"\n") else line + b"\n")
+                rows += 1
+    finally:
+        for handle in handles.values():
+            handle.close()
+    os.makedirs(temp_root, exist_ok=True)
+    os.replace(temp_root, partition_dir(timeseries_file))
+
+    # The partitions replace the single store; git history keeps the old file
+    for path in (store, _index_file(store)):
+        if os.path.exists(path):
+            os.remove(path)
+    if key_columns:
+        for _, path in list_partitions(timeseries_file):
+            _open_index(path, key_columns)
+    print(f"Split {rows} rows from {store} into {len(handles)} partitions under {partition_dir(timeseries_file)}")
+
+def migrate_timeseries(timeseries_file, key_columns=None, partition_column=None):
+    # Bring a legacy file or single store into the layout in use, for readers that bypass pandas
+    if partition_column:
+        _migrate_partitions(timeseries_file, key_columns, partition_column)
+    else:
+        _migrate_legacy(timeseries_file, store_path(timeseries_file))
+
+def _to_lines(df):
+    text = df.to_json(orient="records", lines=True)
+    return text if text.endswith("\n") else f"{text}\n"
+
+def _index_file(store):
+    directory, name = os.path.split(store)
+    # Hidden, so S3 sync leaves it out
+    return os.path.join(directory, f".{name}.idx")
+
+def index_path(timeseries_file):
+    return _index_file(store_path(timeseries_file))
+
+def _digest(value):
+    return hashlib.blake2b(value, digest_size=8).digest()
+
+def _key_digest(record, key_columns):
+    # Hash the decoded JSON values, so rows written by pandas and rows read back hash the same
+    values = [record.get(column) for column in key_columns]
+    return _digest(json.dumps(values, separators=(",", ":"), default=str).encode())
+
+def _index_header(key_columns):
+    return json.dumps({"version": INDEX_VERSION, "keys": list(key_columns)}).encode() + b"\n"
+
+def _load_index(index_file, store, key_columns):
+    # Returns {key digest: (row digest, start, end)}, or None when the index can't be trusted
+    if not os.path.exists(index_file):
+        return None
+    with open(index_file, "rb") as f:
+        header = f.readline()
+        body = f.read()
+    if header != _index_header(key_columns) or len(body) % INDEX_RECORD.size:
+        return None
+
+    index = {}
+    end = 0
+    for key, row, start, end in INDEX_RECORD.iter_unpack(body):
+        index[key] = (row, start, end)
+    store_size = os.path.getsize(store) if os.path.exists(store) else 0
+    return index if end == store_size else None
+
+def _build_index(index_file, store, key_columns):
+    # One full scan of the store; later lines supersede earlier ones with the same keys
+    index = {}
+    records = []
+    if os.path.exists(store):
+        with open(store, "rb") as f:
+            start = 0
+            for line in f:
+                end = start + len(line)
+                if line.strip():
+                    entry = (_key_digest(json.loads(line), key_columns), _digest(line.rstrip(b"\n")), start, end)
+                    index[entry[0]] = entry[1:]
+                    records.append(entry)
+                start = end
+    with open(index_file, "wb") as f:
+        f.write(_index_header(key_columns))
+        f.write(b"".join(INDEX_RECORD.pack(*entry) for entry in records))
+    return index
+
+def _open_index(store, key_columns):
+    index_file = _index_file(store)
+    index = _load_index(index_file, store, key_columns)
+    if index is None:
+        index = _build_index(index_file, store, key_columns)
+    return index
+
+def _append_store(new_df, store, key_columns=None):
+    os.makedirs(os.path.dirname(store) or ".", exist_ok=True)
+    if not key_columns:
+        with open(store, "a") as f:
+            f.write(_to_lines(new_df))
+        return len(new_df)
+
+    # Upsert: only rows whose keys are new or whose values changed are appended
+    index = _open_index(store, key_columns)
+    offset = os.path.getsize(store) if os.path.exists(store) else 0
+    lines = []
+    records = []
+    for line in _to_lines(new_df).encode().splitlines():
+        key = _key_digest(json.loads(line), key_columns)
+        row = _digest(line)
+        if key in index and index[key][0] == row:
+            continue
+        end = offset + len(line) + 1
+        index[key] = (row, offset, end)
+        records.append(INDEX_RECORD.pack(key, row, offset, end))
+        lines.append(line + b"\n")
+        offset = end
+
+    if lines:
+        with open(store, "ab") as f:
+            f.write(b"".join(lines))
+        with open(_index_file(store), "ab") as f:
+            f.write(b"".join(records))
+    return len(lines)
+
+def _live_lines(store, key_columns):
+    # The latest line for each key, in store order
+    index = _open_index(store, key_columns)
+    with open(store, "rb") as f:
+        data = f.read()
+    spans = sorted((start, end) for _, start, end in index.values())
+    return b"".join(data[start:end] for start, end in spans)
+
+def _read_store(store, key_columns=None):
+    import pandas as pd
+    if not os.path.exists(store) or os.path.getsize(store) == 0:
+        return pd.DataFrame()
+    if key_columns:
+        lines = _live_lines(store, key_columns)
+        if not lines:
+            return pd.DataFrame()
+        return pd.read_json(io.BytesIO(lines), lines=True, convert_dates=False, dtype=False)
+    return pd.read_json(store, lines=True, convert_dates=False, dtype=False)
+
+def append_timeseries(new_df, timeseries_file, key_columns=None, partition_column=None):
+    if partition_column:
+        _migrate_partitions(timeseries_file, key_columns, partition_column)
+    else:
+        _migrate_legacy(timeseries_file, store_path(timeseries_file))
+
+    if new_df is None or new_df.empty:
+        return 0
+    if key_columns:
+        new_df = new_df.drop_duplicates(subset=key_columns, keep="last")
+
+    if not partition_column:
+        return _append_store(new_df, store_path(timeseries_file), key_columns)
+
+    # Each row goes to its month's partition; a run normally touches only the current one
+    appended = 0
+    periods = new_df[partition_column].map(partition_period)
+    for period, rows in new_df.groupby(periods, sort=True):
+        appended += _append_store(rows, partition_path(timeseries_file, period), key_columns)
+    return appended
+
+def iter_timeseries(timeseries_file, key_columns=None, partition_column=None, start=None, end=None):
+    # Yields one DataFrame per partition, oldest first. Months outside start..end are
+    # never opened, and rows are filtered on the partition column's date (YYYY-MM-DD).
+    if not partition_column:
+        if start or end:
+            raise ValueError("Reading a date range requires a partition column")
+        store = store_path(timeseries_file)
+        _migrate_legacy(timeseries_file, store)
+        yield _read_store(store, key_columns)
+        return
+
+    _migrate_partitions(timeseries_file, key_columns, partition_column)
+    for _, path in list_partitions(timeseries_file, start, end):
+        ts_df = _read_store(path, key_columns)
+        if (start or end) and not ts_df.empty:
+            # Missing dates are out of any range; as strings ("None", "nan") they would compare after every date
+            in_range = ts_df[partition_column].notna()
+            dates = ts_df[partition_column].astype(str).str[:10]
+            if start:
+                in_range &= dates >= str(start)[:10]
+            if end:
+                in_range &= dates <= str(end)[:10]
+            ts_df = ts_df[in_range]
+        yield ts_df
+
+def read_timeseries(timeseries_file, key_columns=None, categories=None, partition_column=None,
+                    start=None, end=None):
+    # pandas is imported here, not at module level, to keep bot startup light
+    import pandas as pd
+    frames = [frame for frame in iter_timeseries(timeseries_file, key_columns, partition_column, start, end)
+              if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    ts_df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    ts_df = ts_df.reset_index(drop=True)
+
+    # Repetitive labels (cookie names, usernames, statuses) are far smaller and faster as categoricals
+    for column in categories or []:
+        if column in ts_df.columns:
+            ts_df[column] = ts_df[column].astype("category")
+    return ts_df
+
+def compact_timeseries(timeseries_file, key_columns=None, partition_column=None):
+    # Rewrite each store with only its live rows (and split a single store into
+    # partitions when a partition column is given), then rebuild the indexes
+    if partition_column:
+        _migrate_partitions(timeseries_file, key_columns, partition_column)
+        stores = [path for _, path in list_partitions(timeseries_file)]
+    else:
+        store = store_path(timeseries_file)
+        _migrate_legacy(timeseries_file, store)
+        stores = [store] if os.path.exists(store) else []
+
+    before = after = 0
+    for store in stores:
+        before += os.path.getsize(store)
+        if key_columns:
+            lines = _live_lines(store, key_columns)
+            temp_path = f"{store}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(lines)
+            os.replace(temp_path, store)
+            _build_index(_index_file(store), store, key_columns)
+        after += os.path.getsize(store)
+    print(f"Compacted {len(stores)} store(s) from {before} to {after} bytes")
+    return stores
+
+def export_timeseries(timeseries_file, key_columns=None, formats=None, options=None, categories=None,
+                      partition_column=None):
+    # Write the consolidated, deduplicated history in the requested output formats
+    ts_df = read_timeseries(timeseries_file, key_columns, categories, partition_column)
+    written = write_outputs(ts_df, timeseries_file, formats or ["json"], options)
+    print(f"Exported {len(ts_df)} rows to {', '.join(written)}")
+    return written
+
+if __name__ == "__main__":
+    # Usage: python -m utils.timeseries <timeseries_file> --keys date name --formats json parquet
+    #        python -m utils.timeseries <timeseries_file> --keys date name --partition-column date --compact
+    parser = argparse.ArgumentParser(description="Export or compact a bot's timeseries store")
+    parser.add_argument("timeseries_file")
+    parser.add_argument("--keys", nargs="*", default=None)
+    parser.add_argument("--categories", nargs="*", default=None)
+    parser.add_argument("--partition-column", default=None,
+                        help="Date column the store is partitioned by, one JSON Lines file per month")
+    parser.add_argument("--compact", action="store_true",
+                        help="Drop superseded rows (and split into partitions) instead of exporting")
+    parser.add_argument("--formats", nargs="*", default=["json"])
+    parser.add_argument("--parquet-compression", default="snappy")
+    args = parser.parse_args()
+    if args.compact:
+        compact_timeseries(args.timeseries_file, args.keys, args.partition_column)
+    else:
+        export_timeseries(args.timeseries_file, args.keys, args.formats,
+                          {"parquet_compression": args.parquet_compression}, args.categories,
+                          args.partition_column)